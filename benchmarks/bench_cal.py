@@ -0,0 +1,45 @@
+"""
+Cal.write() for one month with 1,000 to 1,000,000 events, 0.7 (which scanned every event for
+every day) vs the current date index, plus the cost of deleting events once the index is built.
+
+Run from the repository root: python benchmarks/bench_cal.py
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+
+
+def build(module, events):
+    cal = module.Cal()
+    cal.year, cal.month = 2020, 6
+    for eventdate, details in events:
+        cal.add_event(eventdate, details)
+    return cal
+
+
+def timed(function, repeat):
+    started = time.time()
+    for i in range(repeat):
+        function()
+    return (time.time() - started) / repeat
+
+rnd = random.Random(1)
+first = datetime.date(2015, 1, 1).toordinal()
+for count in (1000, 100000, 1000000):
+    events = [(datetime.date.fromordinal(first + rnd.randint(0, 3650)), 'event %d' % i) for i in range(count)]
+    cal, cal_07 = build(quandy, events), build(quandy_07, events)
+    old = timed(cal_07.write, 3)
+    cal.write() # build the index outside the timing, as a long-running app would have
+    cal.events.append((datetime.date(2020, 6, 1), 'new')) # and change the month, so it is not cached
+    new = timed(lambda: (cal.events.append((datetime.date(2020, 6, 2), 'x')), cal.write()), 3)
+    deletes = timed(lambda: cal.delete_event(rnd.randint(0, len(cal.events) - 1)), 100)
+    print('%8d events: 0.7 write %.5fs, indexed write %.5fs, delete_event %.6fs' % (count, old, new, deletes))
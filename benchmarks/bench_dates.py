@@ -0,0 +1,44 @@
+"""
+string_to_date() per value vs strings_to_dates() (memoized list, and the NumPy datetime64 path when
+NumPy is installed), on a report column of 500,000 strings with 5,000 distinct dates, and on
+one where every date is distinct.
+
+Run from the repository root: python benchmarks/bench_dates.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+
+rnd = random.Random(18)
+distinct = ['%04d/%02d/%02d' % (rnd.randint(1990, 2030), rnd.randint(1, 12), rnd.randint(1, 28)) for i in range(5000)]
+column = [rnd.choice(distinct) for i in range(500000)]
+tools = quandy.Tools()
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('%-36s %.3fs' % (label, time.time() - started))
+
+timed('string_to_date() per value', lambda: [tools.string_to_date(s) for s in column])
+timed('strings_to_dates()', lambda: tools.strings_to_dates(column))
+try:
+    import numpy
+except ImportError:
+    print('NumPy not installed, skipping as_datetime64=True')
+else:
+    timed('strings_to_dates() into datetime64', lambda: numpy.array(tools.strings_to_dates(column), dtype='datetime64[D]'))
+    timed('strings_to_dates(as_datetime64=True)', lambda: tools.strings_to_dates(column, as_datetime64=True))
+    unpadded = [s.replace('/0', '/') for s in column]
+    timed('  same, unpadded strings (fallback)', lambda: tools.strings_to_dates(unpadded, as_datetime64=True))
+    start = numpy.datetime64('1000-01-01')
+    column = [str(start + i).replace('-', '/') for i in range(500000)]
+    print('all distinct:')
+    timed('string_to_date() per value', lambda: [tools.string_to_date(s) for s in column])
+    timed('strings_to_dates()', lambda: tools.strings_to_dates(column))
+    timed('strings_to_dates(as_datetime64=True)', lambda: tools.strings_to_dates(column, as_datetime64=True))
@@ -0,0 +1,45 @@
+"""
+validate_email() at 0.7 (one re.search of the whole pattern) vs now (a check at each '@' plus the cached
+domain pattern), and iter_validate_emails() reading a file, on 1,000,000 addresses over ~500 domains.
+
+Run from the repository root: python benchmarks/bench_email.py [workers]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+
+rnd = random.Random(17)
+domains = ['mail%d.example%d.com' % (i, i % 7) for i in range(500)]
+addresses = ['%s.%d@%s' % (rnd.choice(['bob', 'alice', 'o_neil', 'x+y']), rnd.randint(0, 99999), rnd.choice(domains))
+             for i in range(1000000)]
+workers = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+tools, tools_07 = quandy.Tools(), quandy_07.Tools()
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('%-40s %.5fs' % (label, time.time() - started))
+
+timed('0.7 validate_email()', lambda: [tools_07.validate_email(address) for address in addresses])
+timed('validate_email()', lambda: [tools.validate_email(address) for address in addresses])
+handle, path = tempfile.mkstemp(suffix='.txt')
+try:
+    with os.fdopen(handle, 'w') as f:
+        f.write('\n'.join(addresses))
+    timed('iter_validate_emails() from a file', lambda: list(tools.iter_validate_emails(path)))
+    if workers:
+        timed('iter_validate_emails(workers=%d)' % workers, lambda: list(tools.iter_validate_emails(path, workers=workers)))
+finally:
+    os.remove(path)
+timed('0.7, 5,000 chars with no valid address', lambda: tools_07.validate_email('a' * 5000 + '@'))
+timed('now, 5,000 chars with no valid address', lambda: tools.validate_email('a' * 5000 + '@'))
@@ -0,0 +1,42 @@
+"""
+fix_1252_codes() on ~15 MB inputs: the 0.7 regex callback (run through the test reference, since 0.7 itself
+raises TypeError on Python 3 strings with gremlins) vs now, and iter_fix_1252_codes() reading bytes from a file.
+
+Run from the repository root: python benchmarks/bench_fix_1252.py
+"""
+
+import io
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+from test_text import fix_1252_reference
+
+tools = quandy.Tools()
+line = u'He said \x93it\x92s fine\x94 \x96 and left\x85 caf\xe9 \x80 5\n'
+dump = line * (15000000 // len(line))
+inputs = [
+    ('smart-quote dump', dump),
+    ('same + one non-latin-1 char', dump + u'\u2603'),
+    ('clean text', dump.replace(u'\x93', '"').replace(u'\x94', '"').replace(u'\x92', "'").replace(u'\x96', '-').replace(u'\x85', '...').replace(u'\x80', 'E')),
+    ]
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('  %-34s %.3fs' % (label, time.time() - started))
+
+for label, text in inputs:
+    print(label)
+    timed('0.7 regex callback', lambda: fix_1252_reference(text))
+    timed('fix_1252_codes()', lambda: tools.fix_1252_codes(text))
+    try:
+        data = text.encode('iso-8859-1')
+    except UnicodeEncodeError:
+        continue
+    timed('iter_fix_1252_codes() from bytes', lambda: list(tools.iter_fix_1252_codes(io.BytesIO(data))))
@@ -0,0 +1,42 @@
+"""
+One render of a 200-field form of every widget type: Formfield.write() + Form.write() at 0.7 and now
+(written straight into table_layout), vs FormSchema.render(), plus the one-off cost of compiling the schema.
+
+Run from the repository root: python benchmarks/bench_forms.py
+"""
+
+import os
+import random
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+from test_forms import make_fields, make_values
+
+fields = make_fields(200)
+form = {'id': 'big_form', 'title': 'Big Form', 'action': '/save'}
+values = make_values(fields, random.Random(24))
+
+
+def write(module, layout=None):
+    formfield = module.Formfield()
+    extra = {} if layout is None else {'layout': layout}
+    html = [formfield.write(**dict(spec, value=values.get(spec['id'], ''), **extra)) for spec in fields]
+    return module.Form().write(html, **dict(form, **extra))
+
+
+def timed(label, function, repeat=50):
+    started = time.time()
+    for i in range(repeat):
+        function()
+    print('%-40s %.3fms' % (label, (time.time() - started) * 1000.0 / repeat))
+
+timed('0.7 Formfield + Form', lambda: write(quandy_07))
+timed('Formfield + Form with table_layout', lambda: write(quandy, quandy.table_layout))
+schema = quandy.FormSchema(fields, form)
+timed('FormSchema.render()', lambda: schema.render(values), 500)
+timed('FormSchema() compile', lambda: quandy.FormSchema(fields, form), 20)
@@ -0,0 +1,32 @@
+"""
+Tools.random_id() vs IdAllocator.next_id() (the default element_ids), per call.
+
+Run from the repository root: python benchmarks/bench_ids.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+
+calls = 1000000
+tools = quandy.Tools()
+ids = quandy.IdAllocator()
+
+started = time.time()
+for i in range(calls):
+    tools.random_id()
+print('Tools.random_id()          %.3fus' % ((time.time() - started) / calls * 1e6))
+
+started = time.time()
+for i in range(calls):
+    ids.next_id()
+print('IdAllocator.next_id()      %.3fus' % ((time.time() - started) / calls * 1e6))
+
+started = time.time()
+with ids.scope():
+    for i in range(calls):
+        ids.next_id()
+print('next_id() inside scope()   %.3fus' % ((time.time() - started) / calls * 1e6))
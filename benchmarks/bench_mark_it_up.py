@@ -0,0 +1,35 @@
+"""
+mark_it_up() at 0.7 (two regex passes) vs now (one pass), and iter_mark_it_up() reading a file object,
+on 1 MB and 20 MB of generated forum text. The 0.7 numbers don't include the addresses its email
+pattern missed.
+
+Run from the repository root: python benchmarks/bench_mark_it_up.py
+"""
+
+import io
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+from test_text import make_posts
+
+tools, tools_07 = quandy.Tools(), quandy_07.Tools()
+posts = '\n'.join(make_posts(2000))
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('  %-30s %.2fs' % (label, time.time() - started))
+
+for megabytes in (1, 20):
+    text = (posts * (megabytes * 1000000 // len(posts) + 1))[:megabytes * 1000000]
+    print('%d MB:' % megabytes)
+    timed('0.7 mark_it_up()', lambda: tools_07.mark_it_up(text))
+    timed('mark_it_up()', lambda: tools.mark_it_up(text))
+    timed('iter_mark_it_up() from a file', lambda: list(tools.iter_mark_it_up(io.StringIO(text))))
@@ -0,0 +1,44 @@
+"""
+friendly_name()/unfriendly_name() at 0.7 vs now (through the cached name_converter) on 100,000 column
+headers with 50 distinct names, and one render of a 50-field form (40 inputs, 5 radio and 5 checkbox
+fields of 20 options), which converts names for every field and option.
+
+Run from the repository root: python benchmarks/bench_names.py
+"""
+
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+
+headers = ['column_name_%d' % (i % 50) for i in range(100000)]
+titles = ['Column Name %d' % (i % 50) for i in range(100000)]
+
+
+def timed(label, function, repeat=1):
+    started = time.time()
+    for i in range(repeat):
+        function()
+    print('%-32s %.2fms' % (label, (time.time() - started) * 1000.0 / repeat))
+
+
+def render_form(module):
+    formfield = module.Formfield()
+    fields = [formfield.write(id='field_%d' % i, value='value %d' % i) for i in range(40)]
+    options = ['Option Number %d' % i for i in range(20)]
+    for i in range(5):
+        fields.append(formfield.write(widget='radio', id='radio_%d' % i, options=options, value=options[3]))
+        fields.append(formfield.write(widget='checkbox', id='check_%d' % i, options=options, value=options[5]))
+    return module.Form().write(fields, id='big_form', title='Big Form')
+
+for label, module in (('0.7', quandy_07), ('now', quandy)):
+    tools = module.Tools()
+    print(label)
+    timed('  friendly_name(), 100,000', lambda: [tools.friendly_name(header) for header in headers])
+    timed('  unfriendly_name(), 100,000', lambda: [tools.unfriendly_name(title) for title in titles])
+    timed('  50-field form, one render', lambda: render_form(module), 20)
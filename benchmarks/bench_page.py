@@ -0,0 +1,33 @@
+"""
+Html.write() at 0.7 vs now (built through a cached PageLayout), and PageLayout.write(), on a typical
+page: 3 css files, 4 js files, rss, html5 doctype and a 10 KB body.
+
+Run from the repository root: python benchmarks/bench_page.py
+"""
+
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+
+calls = 100000
+settings = dict(css_files=['reset.css', 'site.css', 'print.css'], js_files=['jquery.js', 'site.js'],
+                js_extend=['page.js', 'chart.js'], rss='/feed', doctype='html5')
+body = '<p>%s</p>\n' % ('x' * 1000) * 10
+
+
+def timed(label, function):
+    started = time.time()
+    for i in range(calls):
+        function()
+    print('%-20s %.2fus' % (label, (time.time() - started) * 1000000.0 / calls))
+
+html_07, html, layout = quandy_07.Html(), quandy.Html(), quandy.PageLayout(**settings)
+timed('0.7 Html.write()', lambda: html_07.write(body_content=body, page_title='Page', **settings))
+timed('Html.write()', lambda: html.write(body_content=body, page_title='Page', **settings))
+timed('PageLayout.write()', lambda: layout.write('Page', body))
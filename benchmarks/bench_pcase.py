@@ -0,0 +1,40 @@
+"""
+pcase() at 0.7 (a split and join per delimiter) vs now (one regex pass), and pcase_many() with and without
+an LRUCache, on 200,000 two-word names with names=True (mostly distinct, then drawn from 5,000 distinct
+names); plus capitalize() on a 200,000 character string.
+
+Run from the repository root: python benchmarks/bench_pcase.py
+"""
+
+import os
+import random
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+
+rnd = random.Random(19)
+first = ['mary', 'JOHN', 'anne-marie', "d'arcy", 'li', 'o\'brien', 'sean', 'zo\xeb'] + ['name%d' % i for i in range(200)]
+last = ['mcdonald', 'MACLEOD', 'smith', 'van-dyke', "o'neil", 'nguyen'] + ['surname%d' % i for i in range(2000)]
+names = ['%s %s' % (rnd.choice(first), rnd.choice(last)) for i in range(200000)]
+tools, tools_07 = quandy.Tools(), quandy_07.Tools()
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('%-36s %.4fs' % (label, time.time() - started))
+
+for label, column in (('mostly distinct', names), ('5,000 distinct', [rnd.choice(names[:5000]) for name in names])):
+    print('%s:' % label)
+    timed('  0.7 pcase()', lambda: [tools_07.pcase(name, True) for name in column])
+    timed('  pcase()', lambda: [tools.pcase(name, True) for name in column])
+    timed('  pcase_many()', lambda: tools.pcase_many(column, True))
+    timed('  pcase_many() with LRUCache(10000)', lambda: tools.pcase_many(column, True, quandy.LRUCache(10000)))
+text = 'x' * 200000
+timed('0.7 capitalize(), 200,000 chars', lambda: tools_07.capitalize(text))
+timed('capitalize(), 200,000 chars', lambda: tools.capitalize(text))
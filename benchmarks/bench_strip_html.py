@@ -0,0 +1,51 @@
+"""
+strip_html() at 0.7 (a callback per tag) vs now (a plain '' replacement), and iter_strip_html() reading
+20 MB of scraped-style HTML from a file, with its tracemalloc peak.
+
+Run from the repository root: python benchmarks/bench_strip_html.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+
+rnd = random.Random(13)
+pieces = ['<div class="post">', '</div>', '<p>', '</p>', '<a href="http://example.com/%d">' % rnd.randint(0, 999), '</a>',
+          '<img src="/i.png" alt="">', '<br>', 'Some scraped text, ', 'with a < b and c > d, ', '\n']
+page = ''.join(rnd.choice(pieces) for i in range(100000))
+text = (page * (20000000 // len(page) + 1))[:20000000]
+tools, tools_07 = quandy.Tools(), quandy_07.Tools()
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('%-34s %.2fs' % (label, time.time() - started))
+
+timed('0.7 strip_html()', lambda: tools_07.strip_html(text))
+timed('strip_html()', lambda: tools.strip_html(text))
+handle, path = tempfile.mkstemp(suffix='.html')
+os.close(handle)
+try:
+    with open(path, 'w') as f:
+        f.write(text)
+    del(text)
+    with open(path) as f:
+        timed('iter_strip_html() from a file', lambda: [None for piece in tools.iter_strip_html(f)])
+    tracemalloc.start()
+    with open(path) as f:
+        for piece in tools.iter_strip_html(f):
+            pass
+    print('  tracemalloc peak %d KB' % (tracemalloc.get_traced_memory()[1] // 1024))
+    tracemalloc.stop()
+finally:
+    os.remove(path)
@@ -0,0 +1,46 @@
+"""
+TextPipeline vs calling the Tools text methods one by one (0.7 and current), on 100,000 short HTML records.
+0.7's fix_1252_codes() raises TypeError on Python 3 strings with gremlins, so it is left out of the 0.7 runs.
+
+Run from the repository root: python benchmarks/bench_text.py [workers]
+"""
+
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root, 'tests'))
+sys.path.insert(0, root)
+import quandy
+import quandy_07
+from test_text import make_records
+
+records = make_records(100000)
+workers = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+tools, tools_07 = quandy.Tools(), quandy_07.Tools()
+
+
+def timed(label, function):
+    started = time.time()
+    function()
+    print('%-40s %.2fs' % (label, time.time() - started))
+
+
+def one_by_one(tools, steps):
+    functions = [getattr(tools, step) for step in steps if tools is not tools_07 or step != 'fix_1252_codes']
+    output = []
+    for text in records:
+        for function in functions:
+            text = function(text)
+        output.append(text)
+    return output
+
+for steps in (['strip_html', 'fix_1252_codes', 'mark_it_up'], ['strip_html', 'fix_1252_codes', 'mark_it_up', 'pcase']):
+    print(', '.join(steps))
+    timed('  0.7 Tools methods one by one', lambda: one_by_one(tools_07, steps))
+    timed('  Tools methods one by one', lambda: one_by_one(tools, steps))
+    pipeline = quandy.TextPipeline(steps)
+    timed('  TextPipeline.process_many()', lambda: list(pipeline.process_many(records)))
+    if workers:
+        timed('  TextPipeline.process_many(workers=%d)' % workers, lambda: list(pipeline.process_many(records, workers=workers)))
@@ -3,8 +3,8 @@ Quandy is a sweet, simple library to help you create web applications with Pytho
 Quandy plays nice with Web.py and SQLAlchemy.
 """
 
-__version__ = '0.7'
-__releasedate__ = '2020-11-12'
+__version__ = '0.95'
+__releasedate__ = '2026-10-18'
 __author__ = 'Ryan McGreal <ryan@quandyfactory.com>'
 __homepage__ = 'http://quandyfactory.com/projects/5/quandy'
 __repository__ = 'http://github.com/quandyfactory/Quandy'
@@ -16,15 +16,428 @@ except:
     unicode = str
 
 import hashlib # for password hash function
+import hmac # for PasswordHasher
+import binascii
+import struct
+import os
+import time
+import codecs # for the fix_1252_codes function
 import re # for the fix_1252_codes function
+import bisect # for the Cal event index
+import itertools
+import inspect # for Router
+from array import array # for the Cal event store
+import threading # for IdAllocator
 import calendar
 import datetime
+from collections import OrderedDict # for LRUCache
+try:
+    from collections.abc import Mapping, MutableSequence # for Html.iter_table and EventStore
+except ImportError:
+    from collections import Mapping, MutableSequence
 delta = datetime.timedelta(days=1)
 day = datetime.timedelta(days=1) # legacy code
-today = datetime.datetime.date(datetime.datetime.now())
+today = datetime.datetime.date(datetime.datetime.now()) # set at import - use datetime.date.today() in long-running code
 tomorrow = today + delta
 yesterday = today - delta
 
+class LRUCache:
+    """
+    A small least-recently-used cache, used to memoize rendered output.
+
+    Properties:
+
+    * maxsize
+        int specifying how many entries to keep (default is 128)
+    * hits
+        int counting lookups that found an entry
+    * misses
+        int counting lookups that did not find an entry
+
+    Methods:
+
+    * get(key, default)
+        returns the cached value for key, or default
+    * set(key, value)
+        caches a value, dropping the least recently used entry if the cache is full
+    * clear()
+        empties the cache and resets the counters
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key and marks it as recently used, or returns default
+        """
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Caches a value for key, dropping the least recently used entry if the cache is full
+        """
+        if key in self._data:
+            del(self._data[key])
+        elif len(self._data) >= self.maxsize:
+            self._data.popitem(last=False)
+        self._data[key] = value
+
+    def clear(self):
+        """
+        Empties the cache and resets the hit and miss counters
+        """
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class IdAllocator:
+    """
+    Hands out element ids in the form prefix + counter ('id_1', 'id_2', ...), for HTML elements
+    that need a distinct id for DOM manipulation. Unlike Tools.random_id(), the ids never collide
+    and are the same every time the same page is rendered from the same starting point.
+
+    Each thread counts separately, so requests served at the same time on a threaded server
+    don't take ids from each other. Render each request inside scope() (Router.dispatch() does this)
+    and the same page always gets the same ids:
+
+        with element_ids.scope():
+            page = render_page()
+
+    Properties:
+
+    * prefix
+        string put in front of each id (default is 'id_')
+    * start
+        first number for each thread and each scope (default is 1)
+
+    Methods:
+
+    * next_id(prefix)
+        returns the next id, with an optional different prefix
+    * reset(start)
+        starts counting again from start in this thread (default is 1)
+    * scope(start)
+        context manager: counts from start (default is self.start) inside the block,
+        then carries on from where this thread's count was before it
+    """
+
+    def __init__(self, prefix='id_', start=1):
+        self.prefix = prefix
+        self.start = start
+        self._local = threading.local()
+
+    def next_id(self, prefix=None):
+        """
+        Returns the next id, e.g. 'id_12'
+        """
+        if prefix is None:
+            prefix = self.prefix
+        try:
+            counter = self._local.counter
+        except AttributeError:
+            counter = self._local.counter = itertools.count(self.start)
+        return '%s%d' % (prefix, next(counter))
+
+    __call__ = next_id
+
+    def reset(self, start=1):
+        """
+        Starts counting again from start, in this thread
+        """
+        self._local.counter = itertools.count(start)
+
+    def scope(self, start=None):
+        """
+        Returns a context manager that counts from start inside the with block
+        and puts this thread's previous count back afterwards
+        """
+        return _IdScope(self, self.start if start is None else start)
+
+class _IdScope:
+
+    def __init__(self, allocator, start):
+        self.allocator = allocator
+        self.start = start
+
+    def __enter__(self):
+        local = self.allocator._local
+        self.saved = getattr(local, 'counter', None)
+        local.counter = itertools.count(self.start)
+        return self.allocator
+
+    def __exit__(self, *exc_info):
+        local = self.allocator._local
+        if self.saved is None:
+            del(local.counter)
+        else:
+            local.counter = self.saved
+        return False
+
+element_ids = IdAllocator() # default ids for Form, Formfield and table widgets, counted per thread
+
+
+def _event_ordinal(eventdate):
+    if type(eventdate).__name__ != 'date':
+        raise TypeError('eventdate must be type datetime.date, got %s instead' % (type(eventdate).__name__))
+    return eventdate.toordinal()
+
+
+class EventStore(MutableSequence):
+    """
+    Compact storage for calendar events, used by Cal.events.
+
+    Behaves like a list of `( datetime.date, details )` tuples - everything a list does works,
+    including insert, remove, sort, reverse, index, count, clear and comparing with a list -
+    but keeps the dates as an `array('l')` of ordinals alongside a parallel list of details,
+    so a big calendar doesn't need a tuple and a date object per event.
+
+    Properties:
+
+    * ordinals
+        array of event dates as `datetime.date.toordinal()` values, in the order they were added
+    * details
+        list of event details, parallel to ordinals
+    * version
+        int that goes up every time events are added or deleted
+
+    Methods:
+
+    * between(start, end)
+        returns the events between two dates (inclusive) as a list of tuples, in date order
+    * by_day(start, end)
+        returns the events between two dates (inclusive) as a dict `{ datetime.date: [details] }`
+    """
+
+    def __init__(self, events=()):
+        self.ordinals = array('l')
+        self.details = []
+        self.version = 0
+        self._sorted_ordinals = None # built on demand by _sort()
+        self._sorted_positions = None
+        self._removed = [] # sorted slots deleted since the index was built - see _slot_index()
+        self.extend(events)
+
+    def __len__(self):
+        return len(self.details)
+
+    def __iter__(self):
+        fromordinal = datetime.date.fromordinal
+        for ordinal, details in zip(self.ordinals, self.details):
+            yield (fromordinal(ordinal), details)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip([datetime.date.fromordinal(o) for o in self.ordinals[index]], self.details[index]))
+        return (datetime.date.fromordinal(self.ordinals[index]), self.details[index])
+
+    def __eq__(self, other):
+        if isinstance(other, EventStore):
+            return self.ordinals == other.ordinals and self.details == other.details
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'EventStore(%r)' % (list(self), )
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            self.ordinals[index] = array('l', [_event_ordinal(eventdate) for eventdate, details in value])
+            self.details[index] = [details for eventdate, details in value]
+        else:
+            eventdate, details = value
+            self.ordinals[index] = _event_ordinal(eventdate)
+            self.details[index] = details
+        self._sorted_ordinals = self._sorted_positions = None
+        self.version += 1
+
+    def __delitem__(self, index):
+        if isinstance(index, slice) or self._sorted_ordinals is None:
+            del(self.ordinals[index])
+            del(self.details[index])
+            self._sorted_ordinals = self._sorted_positions = None
+            self.version += 1
+            return
+        if index < 0:
+            index += len(self.details)
+        ordinal = self.ordinals[index] # raises IndexError before anything changes
+        # find this event among the ones on the same date, and take it out of the index
+        lo = bisect.bisect_left(self._sorted_ordinals, ordinal)
+        hi = bisect.bisect_right(self._sorted_ordinals, ordinal)
+        slot_index = self._slot_index
+        for i in range(lo, hi):
+            if slot_index(self._sorted_positions[i]) == index:
+                break
+        slot = self._sorted_positions[i]
+        del(self._sorted_ordinals[i])
+        del(self._sorted_positions[i])
+        del(self.ordinals[index])
+        del(self.details[index])
+        # rather than renumbering every position above index, remember the slot and
+        # allow for it when positions are read, until enough deletes build up
+        bisect.insort(self._removed, slot)
+        if len(self._removed) > 1024 and len(self._removed) * 64 > len(self.details):
+            self._renumber()
+        self.version += 1
+
+    def append(self, event):
+        """
+        Adds an ( eventdate, details ) tuple
+        """
+        eventdate, details = event
+        ordinal = _event_ordinal(eventdate)
+        if self._sorted_ordinals is not None:
+            index = bisect.bisect_right(self._sorted_ordinals, ordinal)
+            self._sorted_ordinals.insert(index, ordinal)
+            self._sorted_positions.insert(index, len(self.details) + len(self._removed))
+        self.ordinals.append(ordinal)
+        self.details.append(details)
+        self.version += 1
+
+    def extend(self, events):
+        """
+        Adds an iterable of ( eventdate, details ) tuples
+        """
+        ordinals = array('l')
+        details = []
+        for eventdate, detail in events:
+            ordinals.append(_event_ordinal(eventdate))
+            details.append(detail)
+        if len(details) == 0:
+            return
+        self.ordinals.extend(ordinals)
+        self.details.extend(details)
+        self._sorted_ordinals = self._sorted_positions = None
+        self.version += 1
+
+    def insert(self, index, event):
+        """
+        Inserts an ( eventdate, details ) tuple before index
+        """
+        eventdate, details = event
+        self.ordinals.insert(index, _event_ordinal(eventdate))
+        self.details.insert(index, details)
+        self._sorted_ordinals = self._sorted_positions = None
+        self.version += 1
+
+    def sort(self, key=None, reverse=False):
+        """
+        Sorts the events in place, like list.sort() on ( eventdate, details ) tuples
+        """
+        events = sorted(self, key=key, reverse=reverse)
+        self.ordinals = array('l', [eventdate.toordinal() for eventdate, details in events])
+        self.details = [details for eventdate, details in events]
+        self._sorted_ordinals = self._sorted_positions = None
+        self.version += 1
+
+    def reverse(self):
+        """
+        Reverses the events in place
+        """
+        self.ordinals.reverse()
+        self.details.reverse()
+        self._sorted_ordinals = self._sorted_positions = None
+        self.version += 1
+
+    def clear(self):
+        """
+        Removes every event
+        """
+        del(self[:])
+
+    def pop(self, index=-1):
+        """
+        Removes and returns the ( eventdate, details ) tuple at index (default is the last one)
+        """
+        event = self[index]
+        del(self[index])
+        return event
+
+    def between(self, start, end):
+        """
+        Takes a start and end date and returns a list of ( eventdate, details ) tuples
+        for all events between them (inclusive), in date order.
+        """
+        self._sort()
+        lo = bisect.bisect_left(self._sorted_ordinals, start.toordinal())
+        hi = bisect.bisect_right(self._sorted_ordinals, end.toordinal())
+        fromordinal = datetime.date.fromordinal
+        details = self.details
+        if self._removed:
+            slot_index = self._slot_index
+            return [(fromordinal(self._sorted_ordinals[i]), details[slot_index(self._sorted_positions[i])]) for i in range(lo, hi)]
+        return [(fromordinal(self._sorted_ordinals[i]), details[self._sorted_positions[i]]) for i in range(lo, hi)]
+
+    def by_day(self, start, end):
+        """
+        Takes a start and end date and returns a dict of { eventdate: [details] }
+        for all events between them (inclusive).
+        """
+        output = {}
+        for eventdate, details in self.between(start, end):
+            if eventdate in output:
+                output[eventdate].append(details)
+            else:
+                output[eventdate] = [details]
+        return output
+
+    def _sort(self):
+        """
+        Builds the date-sorted index of event positions if it isn't already built
+        """
+        if self._sorted_ordinals is not None:
+            return
+        # sort one combined int per event (ordinal, then position) instead of a list of positions
+        # plus a list of keys, which keeps peak memory down on big calendars
+        count = len(self.ordinals) or 1
+        keys = sorted([ordinal * count + position for position, ordinal in enumerate(self.ordinals)])
+        self._sorted_ordinals = array('l', (key // count for key in keys))
+        self._sorted_positions = array('l', (key % count for key in keys))
+        self._removed = []
+
+    def _slot_index(self, slot):
+        """
+        Returns the current index in ordinals/details of a position stored in the index
+        (positions are numbered as they were before the deletes listed in _removed)
+        """
+        return slot - bisect.bisect_left(self._removed, slot)
+
+    def _renumber(self):
+        """
+        Folds the deletes in _removed into the stored positions
+        """
+        slot_index = self._slot_index
+        self._sorted_positions = array('l', [slot_index(slot) for slot in self._sorted_positions])
+        self._removed = []
+
+
 class Cal:
     """
     Creates an HTML calendar, with some help from the python standard calendar module.
@@ -73,17 +486,34 @@ class Cal:
     * url
         string specifying the base URL of the calendar application
     * events
-        list specifying any events to be displayed on the calendar
-        events take the form of a dict `{ datetime.date: details }`
-        add events via `add_event()` method
+        EventStore specifying any events to be displayed on the calendar
+        behaves like a list of tuples `( datetime.date, details )`
+        add events via `add_event()` or `add_events()` methods
         delete events via `delete_event()` method
+        events are also indexed by date, so rendering a month only looks at that month's events
+    * events_version
+        int that goes up every time events are added or deleted
+    * provider
+        optional function taking `(start_date, end_date)` and returning an iterable of
+        `( datetime.date, details )` tuples, e.g. from a database query
+        write() only asks it for the dates on display, and shows them after any stored events
+        default is None
+    * cache
+        LRUCache of rendered months, keyed by year, month, display settings, events_version and today's date
+        check `cache.hits` and `cache.misses` to see how well it is working
+        set to None to turn off caching
+        months are not cached when a provider is set
 
     Methods:
 
     * add_event(eventdate, details)
         adds an event to be displayed
+    * add_events(events)
+        adds an iterable of `( datetime.date, details )` events in one go
     * delete_event(index)
         deletes an event from events
+    * get_events(start, end)
+        returns the events between two dates (inclusive), in date order
     * get_prev_year(year, month)
         takes current year and month and returns year and month of previous year
     * get_prev_month(year, month)
@@ -95,6 +525,12 @@ class Cal:
     * write()
         writes out a calendar in HTML format
         includes any events on applicable dates
+    * iter_write()
+        same as write(), but yields the calendar one table row at a time
+    * render_range(start, end)
+        writes out a calendar for every month from start to end (inclusive)
+    * render_year(year)
+        writes out a calendar for every month of a year
     """
 
     def __init__(self):
@@ -104,9 +540,10 @@ class Cal:
         self.months_display = 10 # how many characters to display
         self.weekdays_display = 3 # how many characters to display
 
-        self.year = today.year
-        self.month = today.month
-        self.day = today.day
+        this_day = datetime.date.today()
+        self.year = this_day.year
+        self.month = this_day.month
+        self.day = this_day.day
 
         self.month_start = datetime.date(self.year, self.month, 1)
         self.month_start_weekday = self.month_start.weekday()
@@ -123,7 +560,14 @@ class Cal:
 
         self.url = '/calendar/'
 
-        self.events = [] # events stored in the list as tuples ( date: details )
+        self.events = EventStore() # behaves like a list of tuples ( date, details )
+        self._indexed_events = self.events
+        self._events_version_base = 0
+        self.events_version = 0
+
+        self.provider = None
+
+        self.cache = LRUCache(maxsize=32) # rendered months
 
     def wrap_weekdays(self, val):
         """
@@ -138,15 +582,64 @@ class Cal:
         - eventdate is datetime.date type
         - details is string
         """
-        if type(eventdate).__name__ != 'date':
-            raise TypeError('eventdate must be type datetime.date, got %s instead' % (type(eventdate).__name__))
+        self._sync_index()
         self.events.append( ( eventdate, details, ) )
+        self.events_version = self._events_version_base + self.events.version
+
+    def add_events(self, events):
+        """
+        Adds an iterable of ( eventdate, details ) tuples to be displayed on the calendar.
+        The date index is only re-sorted once, so this is much faster than calling add_event() in a loop.
+        """
+        self._sync_index()
+        self.events.extend(events)
+        self.events_version = self._events_version_base + self.events.version
 
     def delete_event(self, index):
         """
         Takes a list index and deletes the event at that index
         """
+        self._sync_index()
         del(self.events[index])
+        self.events_version = self._events_version_base + self.events.version
+
+    def get_events(self, start, end):
+        """
+        Takes a start and end date and returns a list of ( eventdate, details ) tuples
+        for all events between them (inclusive), in date order.
+        Includes events from self.provider, if there is one.
+        """
+        self._sync_index()
+        output = self.events.between(start, end)
+        if self.provider is not None:
+            output.extend(self.provider(start, end))
+            output.sort(key=lambda event: event[0])
+        return output
+
+    def _get_event_details(self, start, end):
+        """
+        Returns a dict of { eventdate: [details] } for all stored and provided events between two dates
+        """
+        event_details = self.events.by_day(start, end)
+        if self.provider is not None:
+            for eventdate, details in self.provider(start, end):
+                if eventdate in event_details:
+                    event_details[eventdate].append(details)
+                else:
+                    event_details[eventdate] = [details]
+        return event_details
+
+    def _sync_index(self):
+        """
+        Wraps self.events in an EventStore if it was replaced with something else (e.g. a plain list),
+        and brings events_version up to date
+        """
+        if self.events is not self._indexed_events:
+            if not isinstance(self.events, EventStore):
+                self.events = EventStore(self.events)
+            self._indexed_events = self.events
+            self._events_version_base = self.events_version + 1
+        self.events_version = self._events_version_base + self.events.version
 
     def get_prev_year(self, year=today.year, month=today.month):
         """
@@ -192,12 +685,134 @@ class Cal:
         """
         Returns an HTML calendar with all events posted
         """
+        return ''.join(self.iter_write())
+
+    def iter_write(self):
+        """
+        Yields the HTML calendar in chunks (the table head, then one chunk per week)
+        so it can be passed straight on as a WSGI response iterable.
+        Joining the chunks gives exactly what write() returns.
+        """
+        self._sync_index()
+        this_day = self._today()
+        key = self._cache_key(self.year, self.month, this_day)
+        use_cache = self.cache is not None and self.provider is None
+        if use_cache:
+            html = self.cache.get(key)
+            if html is not None:
+                yield html
+                return
+        caltools, weekday_names, weekday_header = self._write_setup()
+        start, end = self._visible_dates(caltools, self.year, self.month)
+        event_details = self._get_event_details(start, end)
+        chunks = []
+        for chunk in self._iter_month(self.year, self.month, caltools, weekday_names, weekday_header, event_details, this_day):
+            chunks.append(chunk)
+            yield chunk
+        if use_cache:
+            self.cache.set(key, ''.join(chunks))
+
+    def render_range(self, start, end):
+        """
+        Takes a start and end month, each a (year, month) tuple or a datetime.date,
+        and returns an HTML calendar for every month from start to end (inclusive).
+        The weekday header and calendar tools are only built once for the whole range,
+        events are looked up (or fetched from self.provider) once for the whole range,
+        and each month is identical to what write() returns for that year and month.
+        """
+        if hasattr(start, 'year'): start = (start.year, start.month)
+        if hasattr(end, 'year'): end = (end.year, end.month)
+        caltools, weekday_names, weekday_header = self._write_setup()
+        self._sync_index()
+        this_day = self._today()
+        use_cache = self.cache is not None and self.provider is None
+        event_details = None
         output = []
         addline = output.append
+        year, month = start
+        while (year, month) <= tuple(end):
+            key = self._cache_key(year, month, this_day)
+            html = None
+            if use_cache:
+                html = self.cache.get(key)
+            if html is None:
+                if event_details is None:
+                    event_details = self._get_event_details(
+                        self._visible_dates(caltools, start[0], start[1])[0],
+                        self._visible_dates(caltools, end[0], end[1])[1])
+                html = self._write_month(year, month, caltools, weekday_names, weekday_header, event_details, this_day)
+                if use_cache:
+                    self.cache.set(key, html)
+            addline(html)
+            year, month = self.get_next_month(year, month)
+        return '\n'.join(output)
+
+    def render_year(self, year=None):
+        """
+        Returns an HTML calendar for each month of a year (default is self.year)
+        """
+        if year is None: year = self.year
+        return self.render_range((year, 1), (year, 12))
+
+    def _today(self):
+        """
+        Returns the date highlighted as today, read on every write so a long-running process
+        moves on at midnight (override it to render for another day)
+        """
+        return datetime.date.today()
 
+    def _cache_key(self, year, month, this_day):
+        """
+        Returns the key for a rendered month in self.cache
+        """
+        return (year, month, self.weekday_start, self.months_display, self.weekdays_display,
+            tuple(self.months), tuple(self.weekdays), self.id, self.classname, self.title, self.caption, self.url,
+            self.events_version, this_day)
+
+    def _visible_dates(self, caltools, year, month):
+        """
+        Returns the first and last dates shown on a month's calendar, including the days from neighbouring months
+        """
+        weeks = caltools.monthdatescalendar(year, month)
+        return weeks[0][0], weeks[-1][-1]
+
+    def _write_setup(self):
+        """
+        Returns the calendar tools, weekday names and weekday header rows shared by every month
+        """
         caltools = calendar.Calendar()
         caltools.setfirstweekday(self.weekday_start) # sets Sunday as the first weekday
 
+        # weekday names
+        weekday_names = [self.wrap_weekdays(x) for x in range(self.weekday_start, self.weekday_start+7)]
+        output = []
+        addline = output.append
+        addline('<tr>')
+        for weekday in weekday_names:
+            if weekday == 'Sunday' or weekday == 'Saturday':
+                this_weekday_class = 'weekend'
+            else:
+                this_weekday_class = ''
+            addline('<th class="%s"><div>%s</div></th>' % (this_weekday_class, weekday[:self.weekdays_display]))
+        addline('</tr>')
+        return caltools, weekday_names, '\n'.join(output)
+
+    def _write_month(self, year, month, caltools, weekday_names, weekday_header, event_details, this_day):
+        """
+        Returns the HTML calendar for one month, taking events from a { date: [details] } dict
+        and highlighting the days around this_day
+        """
+        return ''.join(self._iter_month(year, month, caltools, weekday_names, weekday_header, event_details, this_day))
+
+    def _iter_month(self, year, month, caltools, weekday_names, weekday_header, event_details, this_day):
+        """
+        Yields the HTML calendar for one month in chunks: the table head, each week, and the table foot
+        """
+        this_tomorrow = this_day + delta
+        this_yesterday = this_day - delta
+        output = []
+        addline = output.append
+
         addline('')
         addline('<table id="%s" class="%s">' % (self.id, self.classname))
         if self.caption == True:
@@ -205,62 +820,52 @@ class Cal:
         addline('<thead id="%s_thead" class="%s_thead">' % (self.id, self.classname))
 
         # calendar navigation
+        prev_year = self.get_prev_year(year, month)
+        prev_month = self.get_prev_month(year, month)
+        next_month = self.get_next_month(year, month)
+        next_year = self.get_next_year(year, month)
         addline('<tr id="%s_nav">' % (self.id))
         addline('<th id="%s_prev_year" title="Prev. Year"><a href="%s?y=%s&amp;m=%s">&#171;</a></th>' % (
-            self.id, self.url, self.get_prev_year(self.year, self.month)[0],
-            self.get_prev_year(self.year, self.month)[1], )
+            self.id, self.url, prev_year[0], prev_year[1], )
             )
         addline('<th id="%s_prev_month" title="Prev. Month"><a href="%s?y=%s&amp;m=%s">&#8249;</a></th>' % (
-            self.id, self.url, self.get_prev_month(self.year, self.month)[0],
-            self.get_prev_month(self.year, self.month)[1], )
+            self.id, self.url, prev_month[0], prev_month[1], )
             )
         addline('<th colspan="3"><div>%s %s</div></th>' % (
-            self.months[self.month][:self.months_display], self.year)
+            self.months[month][:self.months_display], year)
             )
         addline('<th id="%s_next_month" title="Next Month"><a href="%s?y=%s&amp;m=%s">&#8250;</a></th>' % (
-            self.id, self.url, self.get_next_month(self.year, self.month)[0],
-            self.get_next_month(self.year, self.month)[1], )
+            self.id, self.url, next_month[0], next_month[1], )
             )
         addline('<th id="%s_next_year" title="Next Year"><a href="%s?y=%s&amp;m=%s">&#187;</a></th>' % (
-            self.id, self.url, self.get_next_year(self.year, self.month)[0],
-            self.get_next_year(self.year, self.month)[1], )
+            self.id, self.url, next_year[0], next_year[1], )
             )
         addline('</tr>')
 
-        # weekday names
-        weekday_names = [self.wrap_weekdays(x) for x in range(self.weekday_start, self.weekday_start+7)]
-        addline('<tr>')
-        for weekday in weekday_names:
-            if weekday == 'Sunday' or weekday == 'Saturday':
-                this_weekday_class = 'weekend'
-            else:
-                this_weekday_class = ''
-            addline('<th class="%s"><div>%s</div></th>' % (this_weekday_class, weekday[:self.weekdays_display]))
-        addline('</tr>')
+        addline(weekday_header)
 
         addline('</thead>')
         addline('<tbody>')
+        yield '%s\n' % '\n'.join(output)
+        output = []
+        addline = output.append
 
         #start writing calendar days
-        itermonthdates = caltools.itermonthdates(self.year, self.month) #produces a date iterator
+        itermonthdates = caltools.itermonthdates(year, month) #produces a date iterator
         col = 0
         for monthdate in itermonthdates:
             if col == 0:
                 addline('<tr>')
 
-            events_this_day = []
-            for event in self.events:
-                #print event # testing only
-                if event[0] == monthdate:
-                    events_this_day.append(event[1])
+            events_this_day = event_details.get(monthdate, [])
 
-            if monthdate == today:
+            if monthdate == this_day:
                 today_note = ' (Today)'
                 today_class = 'date today'
-            elif monthdate == tomorrow:
+            elif monthdate == this_tomorrow:
                 today_note = ' (Tomorrow)'
                 today_class = 'date tomorrow'
-            elif monthdate == yesterday:
+            elif monthdate == this_yesterday:
                 today_note = ' (Yesterday)'
                 today_class = 'date yesterday'
             else:
@@ -280,14 +885,18 @@ class Cal:
 
             if col > 6:
                 addline('</tr>')
+                yield '%s\n' % '\n'.join(output)
+                output = []
+                addline = output.append
                 col = 0
 
         addline('</tbody>')
         addline('</table>')
 
-        return '\n'.join(output)
+        yield '\n'.join(output)
 
 
+page_layouts = LRUCache(maxsize=32) # PageLayouts built by Html.write(), keyed by its parameters
 
 class Html:
     """
@@ -318,7 +927,176 @@ class Html:
         charset     - page character set (default is 'UTF-8')
         favicon_url - path to favicon file (default is /favicon.ico')
         nocache     - nocache meta tag (default is True)
+
+        If every page on a site shares these settings, build a PageLayout once and call its write() method instead.
+        """
+        layout = self._get_layout(site_domain, site_name, css_path, css_files, css_extend, js_path, js_files,
+            js_extend, page_author, doctype, lang, charset, favicon_url, nocache, rss)
+        return layout.write(page_title, body_content)
+
+    def iter_write(self, body_content = '', site_domain='http://localhost/', site_name='Default Site Name', css_path='/static/styles/', css_files=[], css_extend=[], js_path='/static/scripts/', js_files=[], js_extend=[], page_title='Default Page Title', page_author='Default Page Author', doctype='html 4 strict', lang='en', charset='UTF-8', favicon_url='/static/favicon.ico', nocache=False, rss=''):
+        """
+        Same parameters as write(), but body_content can also be an iterable of strings (e.g. a generator).
+        Yields the page as bytes encoded in charset - the head, each body chunk as it is produced, then the
+        script tags - so it can be returned directly as a WSGI response iterable.
+        """
+        layout = self._get_layout(site_domain, site_name, css_path, css_files, css_extend, js_path, js_files,
+            js_extend, page_author, doctype, lang, charset, favicon_url, nocache, rss)
+        return layout.iter_write(page_title, body_content)
+
+    def _get_layout(self, site_domain, site_name, css_path, css_files, css_extend, js_path, js_files, js_extend, page_author, doctype, lang, charset, favicon_url, nocache, rss):
+        """
+        Returns a PageLayout for these parameters, reusing one from page_layouts if possible
+        """
+        # the file lists are read once here, so a generator is used up for the key and the layout alike
+        css_files, css_extend, js_files, js_extend = tuple(css_files), tuple(css_extend), tuple(js_files), tuple(js_extend)
+        key = (site_domain, site_name, css_path, css_files, css_extend, js_path, js_files,
+            js_extend, page_author, doctype, lang, charset, favicon_url, nocache, rss)
+        layout = page_layouts.get(key)
+        if layout is None:
+            layout = PageLayout(site_domain, site_name, css_path, css_files, css_extend, js_path, js_files,
+                js_extend, page_author, doctype, lang, charset, favicon_url, nocache, rss)
+            page_layouts.set(key, layout)
+        return layout
+
+    def tag(self, tagname='div', innertext = '', attributes = {}):
+        """
+        Summary:
+        Produces an HTML element with opening and closing tags, attributes and inner text/HTML.
+
+        Parameters:
+        tagname - string
+        innertext - string (optional - default = '')
+        attributes - dictionary (optional - default = {})
+
+        output:
+        Returns an HTML element as a string.
+        """
+        output = ['<%s' % tagname]
+        output.extend([' %s="%s"' % (k, v) for k, v in attributes.items()])
+        output.append('>%s</%s>' % (innertext, tagname))
+        return ''.join(output)
+
+    def make_table_from_dictionary(self, collection = {}, caption = 'Dictionary', id = '', ids=None):
+        """
+        Summary:
+        Converts a dictionary into an HTML table with key, value as th, td
+
+        Parameters:
+        collection - the dictionary of keys and values
+        caption - optional caption (default is no caption)
+        id - optional id (default is the next id from ids)
+        ids - IdAllocator to take a default id from (default is element_ids)
+
+        output:
+        Returns an HTML table as a string
+        """
+        if id == '':
+            id = (ids or element_ids).next_id()
+        output = ['<table id="%s">' % id]
+        if caption != '':
+            output.append('<caption>%s</caption>' % caption)
+        for k, v in collection.items():
+            output.append('  <tr>\n    <th>%s</th>\n    <td>%s</td>\n  </tr>' % (k, v))
+        output.append('</table>')
+        return '\n'.join(output)
+
+    def iter_table(self, rows, columns=None, formatters=None, caption='', id='', page_size=0, page=1, ids=None):
+        """
+        Summary:
+        Writes out an HTML table from any iterable of rows (a list, a generator, a DB-API cursor,
+        an SQLAlchemy result), yielding the HTML a row at a time so memory stays flat however many rows there are.
+
+        Parameters:
+        rows - iterable of rows; each row is a sequence (tuple, list, sqlite3.Row, SQLAlchemy Row) or a mapping
+               (a dictionary, an SQLAlchemy RowMapping from result.mappings())
+        columns - list of column names for the header row (optional - taken from rows.keys(),
+                  the cursor description or the keys of the first row if it is a mapping)
+        formatters - dictionary of { column name: function } (needs column names) or list of functions
+                     in column order, each taking a value and returning the cell's HTML
+                     (optional - default is '%s' % value)
+        caption - optional caption (default is no caption)
+        id - optional id (default is the next id from ids)
+        page_size - rows per page (optional - default = 0, i.e. every row)
+        page - page number, starting at 1 (optional - default = 1)
+        ids - IdAllocator to take a default id from (default is element_ids)
+
+        output:
+        Yields the HTML table as strings: the table head, then one string per row, then the table foot.
+        """
+        if columns is None:
+            if hasattr(rows, 'keys'):
+                columns = list(rows.keys())
+            elif getattr(rows, 'description', None):
+                columns = [d[0] for d in rows.description]
+        if page_size > 0:
+            rows = itertools.islice(rows, (page - 1) * page_size, page * page_size)
+        rows = iter(rows)
+        if columns is None:
+            # look at the first row before anything is yielded, so dictionary rows can name the columns
+            for first in rows:
+                if isinstance(first, Mapping):
+                    columns = list(first.keys())
+                rows = itertools.chain([first], rows)
+                break
+
+        # one formatter per column position
+        if isinstance(formatters, dict):
+            if columns is None:
+                raise ValueError('iter_table needs column names to use a dictionary of formatters')
+            cellformats = [formatters.get(column) for column in columns]
+        elif formatters:
+            cellformats = list(formatters)
+        else:
+            cellformats = []
+
+        if id == '':
+            id = (ids or element_ids).next_id()
+
+        output = ['<table id="%s">' % id]
+        if caption != '':
+            output.append('<caption>%s</caption>' % caption)
+        if columns is not None:
+            output.append('  <thead>\n  <tr>')
+            output.extend(['    <th>%s</th>' % column for column in columns])
+            output.append('  </tr>\n  </thead>')
+        output.append('  <tbody>\n')
+        yield '\n'.join(output)
+
+        for row in rows:
+            if isinstance(row, Mapping): # a dict, an SQLAlchemy RowMapping, ...
+                values = [row.get(column, '') for column in columns] if columns is not None else list(row.values())
+            else:
+                values = row
+            output = ['  <tr>\n']
+            addline = output.append
+            for i, value in enumerate(values):
+                if i < len(cellformats) and cellformats[i] is not None:
+                    value = cellformats[i](value)
+                addline('    <td>%s</td>\n' % (value, ))
+            addline('  </tr>\n')
+            yield ''.join(output)
+
+        yield '  </tbody>\n</table>'
+
+
+class PageLayout:
+    """
+    Summary:
+    A precompiled HTML page shell, for sites where everything but the title and body is fixed.
+    Takes the same parameters as Html.write() (apart from page_title and body_content) and builds
+    the doctype, head and script tags once, so each page only fills in the title and body.
+
+    Methods:
+    write(page_title, body_content) - returns the full HTML page as a string, same as Html.write()
+    iter_write(page_title, body_content) - yields the page as bytes, taking the body as a string or an iterable of strings
+    """
+
+    def __init__(self, site_domain='http://localhost/', site_name='Default Site Name', css_path='/static/styles/', css_files=[], css_extend=[], js_path='/static/scripts/', js_files=[], js_extend=[], page_author='Default Page Author', doctype='html 4 strict', lang='en', charset='UTF-8', favicon_url='/static/favicon.ico', nocache=False, rss=''):
+        """
+        Parameters are the same as for Html.write()
         """
+        self.charset = charset
         output = []
         addline = output.append
         closetag = ''
@@ -363,11 +1141,12 @@ class Html:
         if rss != '':
             addline('    <link href="%s" rel="alternate" title="RSS" type="application/rss+xml"%s>' % (rss, closetag))
         addline('    <link rel="shortcut icon" href="%s"%s>' % (favicon_url, closetag))
-        addline('    <title>%s - %s</title>' % (page_title, site_name))
-
-        addline('  </head>\n  <body>')
-        addline(body_content)
+        addline('    <title>')
+        self.head = '\n'.join(output) # everything up to the page title
+        self.title_tail = ' - %s</title>\n  </head>\n  <body>\n' % (site_name) # everything from the page title to the body
 
+        output = ['']
+        addline = output.append
         for file in js_files:
             addline('    <script type="text/javascript" src="%s%s"></script>' % (js_path, file))
         for file in js_extend:
@@ -375,49 +1154,43 @@ class Html:
 
         addline('  </body>')
         addline('</html>')
-        return '\n'.join(output)
+        self.tail = '\n'.join(output) # everything after the body
 
-    def tag(self, tagname='div', innertext = '', attributes = {}):
-        """
-        Summary:
-        Produces an HTML element with opening and closing tags, attributes and inner text/HTML.
-
-        Parameters:
-        tagname - string
-        innertext - string (optional - default = '')
-        attributes - dictionary (optional - default = {})
+        self.head_bytes = None # encoded once, on the first call to iter_write()
 
-        output:
-        Returns an HTML element as a string.
+    def write(self, page_title='Default Page Title', body_content=''):
         """
-        output = ['<%s' % tagname]
-        output.extend([' %s="%s"' % (k, v) for k, v in attributes.items()])
-        output.append('>%s</%s>' % (innertext, tagname))
-        return ''.join(output)
-
-    def make_table_from_dictionary(self, collection = {}, caption = 'Dictionary', id = ''):
+        Takes a page title and body content and returns the full HTML page as a string
         """
-        Summary:
-        Converts a dictionary into an HTML table with key, value as th, td
+        return '%s%s%s%s%s' % (self.head, page_title, self.title_tail, body_content, self.tail)
 
-        Parameters:
-        collection - the dictionary of keys and values
-        caption - optional caption (default is no caption)
-        id - optional id (default is random_id)
+    def iter_write(self, page_title='Default Page Title', body_content=''):
+        """
+        Takes a page title and body content (a string, or an iterable of strings) and yields the page
+        as bytes in self.charset: the head, each body chunk as it is produced, and the script tail.
+        Characters the charset can't encode are written as HTML character references.
+        Joining the chunks gives write() encoded to bytes.
+        """
+        encode = self._encode
+        if self.head_bytes is None:
+            self.title_tail_bytes = encode(self.title_tail)
+            self.tail_bytes = encode(self.tail)
+            self.head_bytes = encode(self.head)
+        yield self.head_bytes + encode(page_title) + self.title_tail_bytes
+        if isinstance(body_content, (bytes, unicode, str)):
+            body_content = (body_content, )
+        for chunk in body_content:
+            if chunk:
+                yield encode(chunk)
+        yield self.tail_bytes
 
-        output:
-        Returns an HTML table as a string
+    def _encode(self, text):
         """
-        tools = Tools()
-        if id == '':
-            id = tools.random_id()
-        output = ['<table id="%s">' % id]
-        if caption != '':
-            output.append('<caption>%s</caption>' % caption)
-        for k, v in collection.items():
-            output.append('  <tr>\n    <th>%s</th>\n    <td>%s</td>\n  </tr>' % (k, v))
-        output.append('</table>')
-        return '\n'.join(output)
+        Returns text encoded as bytes in self.charset (bytes are passed through as they are)
+        """
+        if isinstance(text, bytes):
+            return text
+        return unicode(text).encode(self.charset, 'xmlcharrefreplace')
 
 
 cp_1252_chars = {
@@ -451,6 +1224,291 @@ cp_1252_chars = {
     u"\x9F": u"\u0178", # LATIN CAPITAL LETTER Y WITH DIAERESIS
 }
 
+# precompiled patterns and helpers for the Tools text methods and TextPipeline
+html_tag_pattern = re.compile(r'<[^>]+>')
+gremlin_pattern = re.compile(u"[\x80-\x9f]")
+gremlin_bytes_pattern = re.compile(b"[\x80-\x9f]")
+url_pattern = re.compile(r'((https?|ftp|gopher|telnet|file|notes|ms-help):((//)|(\\\\))+[\w\d:#@%/;$()~_?\+-=\\\.&]*)')
+# via http://www.geekzilla.co.uk/View2D3B0109-C1B2-4B4E-BFFD-E8088CBC85FD.htm
+email_pattern = re.compile(r'([a-zA-Z_0-9.-]+@[a-zA-Z_0-9.-]+\.\w+)')
+# URLs and emails in one pass, so email addresses are never looked for inside links that were just made
+link_pattern = re.compile(r'(?P<url>%s)|(?P<email>%s)' % (url_pattern.pattern, email_pattern.pattern))
+
+def _strip_html(stuff):
+    if '<' not in stuff:
+        return stuff
+    return html_tag_pattern.sub('', stuff)
+
+def _keep_latin_1(error):
+    # decode error handler: the few bytes cp1252 leaves undefined stay as their iso-8859-1 characters
+    return (error.object[error.start:error.end].decode("iso-8859-1"), error.end)
+
+codecs.register_error('quandy-keep-latin-1', _keep_latin_1)
+
+def _fix_gremlin(match):
+    s = match.group(0)
+    return cp_1252_chars.get(s, s)
+
+def _fix_1252_codes(text):
+    if isinstance(text, bytes):
+        if gremlin_bytes_pattern.search(text) is None:
+            return text
+        return text.decode("cp1252", "quandy-keep-latin-1")
+    if gremlin_pattern.search(text) is None:
+        return text
+    try:
+        # cp1252 is iso-8859-1 apart from the gremlins, so this does the whole fix in two C passes
+        return text.encode("iso-8859-1").decode("cp1252", "quandy-keep-latin-1")
+    except UnicodeEncodeError:
+        # text has characters beyond iso-8859-1 as well: fix it in pieces, so only
+        # the pieces that have them need the slower regex
+        if len(text) > 65536:
+            return ''.join([_fix_1252_codes(text[i:i + 65536]) for i in range(0, len(text), 65536)])
+        return gremlin_pattern.sub(_fix_gremlin, text)
+
+def _iter_fix_1252_codes(source, chunk_size=65536):
+    # every character is fixed on its own (and iso-8859-1 is one byte per character),
+    # so chunks never need to be joined up; bytes are always decoded so every chunk is unicode
+    for chunk in _iter_chunks(source, chunk_size):
+        if isinstance(chunk, bytes):
+            yield chunk.decode("cp1252", "quandy-keep-latin-1")
+        else:
+            yield _fix_1252_codes(chunk)
+
+def _make_link(match):
+    url = match.group('url')
+    if url is not None:
+        return '<a href="%s">%s</a>' % (url, url)
+    email = match.group('email')
+    return '<a href="mailto:%s">%s</a>' % (email, email)
+
+def _mark_it_up(plaintext):
+    if ':' not in plaintext and '@' not in plaintext:
+        return plaintext
+    return link_pattern.sub(_make_link, plaintext)
+
+def _iter_mark_it_up(source, chunk_size=65536):
+    # links and email addresses never contain whitespace, so everything up to the last
+    # whitespace in the buffer can be marked up without splitting a match
+    carry = ''
+    for chunk in _iter_chunks(source, chunk_size):
+        text = carry + chunk
+        end = max([text.rfind(c) for c in ' \n\t\r\f\v']) + 1
+        if end == 0:
+            carry = text
+            continue
+        carry = text[end:]
+        yield _mark_it_up(text[:end])
+    if carry:
+        yield _mark_it_up(carry)
+
+def _iter_chunks(source, chunk_size=65536):
+    """
+    Yields strings from a string, a file object (read chunk_size at a time) or an iterable of strings
+    """
+    if isinstance(source, (bytes, str, unicode)):
+        yield source
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+list_delimiter_pattern = re.compile(r'[\t\n\x0b\x0c\r,; ]+') # what make_list_from_string splits on
+other_whitespace_pattern = re.compile(r'[^\S\t\n\x0b\x0c\r ]', re.UNICODE) # whitespace it doesn't split on
+
+def _splits_on_whitespace(text):
+    # True if the only whitespace in text is what make_list_from_string splits on, so that once
+    # commas and semicolons are spaces, str.split() gives the same tokens without a regex pass
+    isascii = getattr(text, 'isascii', None)
+    if isascii is not None and isascii():
+        return not ('\x1c' in text or '\x1d' in text or '\x1e' in text or '\x1f' in text)
+    return other_whitespace_pattern.search(text) is None
+
+def _split_list(text):
+    # make_list_from_string() without the [''] for empty input
+    if _splits_on_whitespace(text):
+        return text.replace(',', ' ').replace(';', ' ').split()
+    return [token for token in list_delimiter_pattern.sub(' ', text).strip().split(' ') if token]
+
+def _iter_tokens(source, chunk_size=65536):
+    # make_list_from_string() strips the whole string before splitting, so leading whitespace is dropped
+    # until the first token starts, and tokens that might end up at the very end with whitespace
+    # on them are held back until a later token shows they aren't last
+    pending = '' # text after the last delimiter, which the next chunk may continue
+    held = []
+    started = False
+    for chunk in _iter_chunks(source, chunk_size):
+        text = pending + chunk
+        if not started:
+            stripped = text.lstrip().lstrip(',;')
+            while stripped != text: # commas and semicolons count as whitespace here
+                text = stripped
+                stripped = text.lstrip().lstrip(',;')
+            if not text:
+                continue
+            started = True
+        if _splits_on_whitespace(text):
+            tokens = text.replace(',', ' ').replace(';', ' ').split()
+            if not text or text[-1] in '\t\n\x0b\x0c\r,; ':
+                pending = ''
+            else:
+                pending = tokens.pop()
+        else:
+            tokens = list_delimiter_pattern.split(text)
+            pending = tokens.pop()
+        for token in tokens:
+            if not token:
+                continue
+            if token[-1].isspace():
+                held.append(token)
+                continue
+            for held_token in held:
+                yield held_token
+            held = []
+            yield token
+    held.append(pending)
+    for token in list_delimiter_pattern.split(' '.join(held).rstrip()):
+        if token:
+            yield token
+
+def _iter_batches(items, size):
+    """
+    Yields lists of up to size items from an iterable
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+def _iter_parallel(function, args, batches, workers):
+    """
+    Runs function(args, batch) for each batch in a pool of worker processes and yields the results
+    in order, keeping at most two batches per worker in flight so memory stays flat on huge inputs.
+    """
+    from concurrent.futures import ProcessPoolExecutor # Python 3, or the futures backport on Python 2
+    from collections import deque
+    pending = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for batch in batches:
+            pending.append(executor.submit(function, args, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+# email addresses, as checked by Tools.validate_email - regex via: http://www.regular-expressions.info/email.html
+email_atom_chars = frozenset("abcdefghijklmnopqrstuvwxyz0123456789!#$%&'*+/=?^_`{|}~-")
+email_domain_pattern = re.compile(r'(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?')
+email_domain_cache = LRUCache(maxsize=10000) # domain part -> bool, mailing lists repeat domains a lot
+
+def _validate_email(email):
+    # same answer as searching for the whole local@domain pattern: that matches wherever an '@' has
+    # a local part character right before it and a domain right after it, the rest of the local part
+    # can't change the result - so only the domain needs the regex, and it can be cached
+    at = email.find('@')
+    while at != -1:
+        if at and email[at-1] in email_atom_chars:
+            rest = email[at+1:]
+            valid = email_domain_cache.get(rest)
+            if valid is None:
+                valid = email_domain_pattern.match(rest) is not None
+                email_domain_cache.set(rest, valid)
+            if valid:
+                return True
+        at = email.find('@', at + 1)
+    return False
+
+def _iter_numbered_lines(source):
+    # yields (line_number, stripped line) for non-blank lines of a file path or an iterable of strings
+    if isinstance(source, (str, unicode)):
+        with open(source) as lines:
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                if line:
+                    yield (number, line)
+    else:
+        for number, line in enumerate(source, 1):
+            line = line.strip()
+            if line:
+                yield (number, line)
+
+def _validate_email_batch(args, batch):
+    return [(number, email, _validate_email(email)) for number, email in batch]
+
+month_names = ' January February March April May June July August September October November December'.split(' ') # month_names[1] is January
+
+# proper case: the first character, and every character after a space, hyphen or quote, gets capitalized
+pcase_pattern = re.compile(r'(?:^|(?<=[ \-"\']))[^ \-"\']')
+# names: the character after Mc or Mac - 'Mcmac' is there because capitalizing after Mc can make a new Mac
+pcase_names_pattern = re.compile(r'(?:(?<=Mc)|(?<=Mac)|(?<=Mcmac)).', re.DOTALL)
+
+def _capitalize_match(match):
+    return match.group().capitalize()
+
+def _pcase(text, names=False):
+    # the same rules as splitting and rejoining on each delimiter in turn, in one regex pass
+    text = pcase_pattern.sub(_capitalize_match, text.lower())
+    text = text.replace("'S ", "'s ") # fix incorrect capitalize on possessive s
+    if names==True:
+        text = pcase_names_pattern.sub(_capitalize_match, text)
+    return text.strip()
+
+def _map_memoized(function, values):
+    # returns [function(value) for value in values], calling function once per distinct value
+    results = {}
+    lookup = results.get
+    missing = results # a value no function returns
+    output = []
+    addline = output.append
+    for value in values:
+        result = lookup(value, missing)
+        if result is missing:
+            result = results[value] = function(value)
+        addline(result)
+    return output
+
+def _md4_lrot(x, n):
+    return ((x << n) | (x >> (32 - n))) & 0xffffffff
+
+def _md4_hexdigest(data):
+    """
+    Pure Python MD4 (RFC 1320), for OpenSSL builds that no longer include it.
+    Only used to check old make_hash() digests, so speed doesn't matter much.
+    """
+    message = bytearray(data)
+    length = (8 * len(message)) & 0xffffffffffffffff
+    message.append(0x80)
+    while len(message) % 64 != 56:
+        message.append(0)
+    message += struct.pack('<Q', length)
+    h = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476]
+    lrot = _md4_lrot
+    for offset in range(0, len(message), 64):
+        x = struct.unpack('<16I', bytes(message[offset:offset+64]))
+        a, b, c, d = h
+        for i in range(16):
+            a, b, c, d = d, lrot((a + ((b & c) | (~b & d)) + x[i]) & 0xffffffff, (3, 7, 11, 19)[i % 4]), b, c
+        for i in range(16):
+            k = (i % 4) * 4 + i // 4
+            a, b, c, d = d, lrot((a + ((b & c) | (b & d) | (c & d)) + x[k] + 0x5a827999) & 0xffffffff, (3, 5, 9, 13)[i % 4]), b, c
+        for i in range(16):
+            k = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)[i]
+            a, b, c, d = d, lrot((a + (b ^ c ^ d) + x[k] + 0x6ed9eba1) & 0xffffffff, (3, 9, 11, 15)[i % 4]), b, c
+        h = [(v + n) & 0xffffffff for v, n in zip(h, (a, b, c, d))]
+    return binascii.hexlify(struct.pack('<4I', *h)).decode('ascii')
+
 class Tools:
     """
     Various tools for easing the creation of web pages.
@@ -473,50 +1531,36 @@ class Tools:
         Checks whether an email address looks valid. Returns True or False.
         Regex via: http://www.regular-expressions.info/email.html
         """
-        if re.search("[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*@(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z0-9](?:[a-z0-9-]*[a-z0-9])?", email):
-            return True
+        return _validate_email(email)
+
+    def iter_validate_emails(self, source, workers=0, batch_size=10000):
+        """
+        Checks a mailing list one address per line and yields (line_number, address, valid)
+        for each non-blank line, without building a list. source is a file path or any iterable
+        of strings (e.g. an open file). If workers > 0, batches of batch_size lines are checked
+        in that many worker processes and the results still come out in order.
+        """
+        lines = _iter_numbered_lines(source)
+        if workers > 0:
+            for results in _iter_parallel(_validate_email_batch, None, _iter_batches(lines, batch_size), workers):
+                for result in results:
+                    yield result
         else:
-            return False
+            for number, email in lines:
+                yield (number, email, _validate_email(email))
 
     def validate_password(self, username, password1, password2, strict=False, minlen=8, maxlen=40):
         """
-        Takes two passwords and returns True if they're valid, False if they're not valid.
+        Takes two passwords and returns True if they're valid, or a message saying why they're not.
         Default minimum length is 8 chars, maximum length is 40 chars
+        strict=True also requires characters from three of the four groups (see PasswordPolicy)
         """
-        if password1 != password2:
-            return 'Entered passwords do not match'
-        if len(password1) < minlen:
-            return 'Password must be at least %s characters in length' % minlen
-        if len(password1) > maxlen:
-            return 'Password cannot be more than %s characters in length' % maxlen
-        if password1 == username:
-            return 'Password must not be the same as username'
-        if strict == True:
-
-            group_1 = 'abcdefghijklmnopqrstuvwxyz' # lowercase letters
-            group_2 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' # uppercase letters
-            group_3 = '0123456789' # numerals
-
-            in_group_1 = 0
-            in_group_2 = 0
-            in_group_3 = 0
-            in_group_4 = 0 # characters that don't fall into group 1, 2, or 3
-
-            for letter in password1:
-                if letter in group_1:
-                    in_group_1 = 1
-                if letter in group_2:
-                    in_group_2 = 1
-                if letter in group_3:
-                    in_group_3 = 1
-                if letter not in '%s%s%s' % (group_1, group_2, group_3):
-                    in_group_4 = 1
-
-            if in_group_1 + in_group_2 + in_group_3 + in_group_4 < 3:
-                return 'Password must contain characters from at least three of the following character groups: lowercase letters, uppercase letters, numerals, and other symbols.'
-
-        # didn't fail any tests
-        return True
+        key = (strict == True, minlen, maxlen)
+        policy = password_policies.get(key)
+        if policy is None:
+            policy = PasswordPolicy(minlen=minlen, maxlen=maxlen, min_groups=3 if key[0] else 0)
+            password_policies.set(key, policy)
+        return policy.validate(username, password1, password2)
 
     def generate_random_password(self, pswd_len=8):
         """
@@ -535,15 +1579,17 @@ class Tools:
         """
         Replace non-standard Microsoft character codes from the Windows-1252 character set in a unicode string with proper unicode codes.
         Code originally from: http://effbot.org/zone/unicode-gremlins.htm
+        Strings without any of these characters are returned as they are.
         """
-        if re.search(u"[\x80-\x9f]", text):
-            def fixup(m):
-                s = m.group(0)
-                return cp_1252_chars.get(s, s)
-            if isinstance(text, type("")):
-                text = unicode(text, "iso-8859-1")
-            text = re.sub(u"[\x80-\x9f]", fixup, text)
-        return text
+        return _fix_1252_codes(text)
+
+    def iter_fix_1252_codes(self, source, chunk_size=65536):
+        """
+        Same as fix_1252_codes(), but takes a file object (read chunk_size characters or bytes at a time)
+        or an iterable of strings and yields the fixed text in pieces, for streaming multi-GB exports.
+        Bytes are decoded as iso-8859-1, so every piece is unicode.
+        """
+        return _iter_fix_1252_codes(source, chunk_size)
 
     def single_or_plural(self, value, single_string='', plural_string='s'):
         """
@@ -558,9 +1604,15 @@ class Tools:
     def make_hash(self, password, salt='saltydog', type='md4'):
         """
         Takes a plain text password and returns a salted hash.
+        Kept so existing digests can be checked - use PasswordHasher for new passwords.
         """
-        fullpassword = password+salt
-        return hashlib.new(type, fullpassword.encode('utf-16le')).hexdigest().upper()
+        fullpassword = (password+salt).encode('utf-16le')
+        try:
+            return hashlib.new(type, fullpassword).hexdigest().upper()
+        except ValueError:
+            if type != 'md4':
+                raise
+            return _md4_hexdigest(fullpassword).upper() # OpenSSL build without md4
 
     def weekday_name(self, adate):
         """
@@ -573,26 +1625,36 @@ class Tools:
         """
         Converts URLs and Email addresses to hyperlinks
         """
-        def make_link(match):
-            return '<a href="%s">%s</a>' % (match.group(1), match.group(1))
-        def make_email(match):
-            return '<a href="mailto:%s">%s</a>' % (match.group(1), match.group(1))
-        rx = re.compile(r'((https?|ftp|gopher|telnet|file|notes|ms-help):((//)|(\\\\))+[\w\d:#@%/;$()~_?\+-=\\\.&]*)')
-        # via http://www.geekzilla.co.uk/View2D3B0109-C1B2-4B4E-BFFD-E8088CBC85FD.htm
-        output = rx.sub(make_link, plaintext)
-        rx = re.compile(r'([a-zA-Z_0-9.-]+@[a-zA-Z_0-9.-]+.w+)')
-        output = rx.sub(make_email, output)
-        return output
+        return _mark_it_up(plaintext)
+
+    def iter_mark_it_up(self, source, chunk_size=65536):
+        """
+        Same as mark_it_up(), but takes a file object (read chunk_size characters at a time) or an iterable
+        of strings and yields the marked up text in pieces, so multi-megabyte posts don't have to be in
+        memory at once. Links and email addresses are never split between chunks.
+        """
+        return _iter_mark_it_up(source, chunk_size)
 
     def strip_html(self, stuff):
         """
         Removes all HTML tags and attributes from a string
         """
-        def remove_tags(match):
-            return ''
-        rx = re.compile(r'<[^>]+>')
-        output = rx.sub(remove_tags, stuff)
-        return output
+        return _strip_html(stuff)
+
+    def iter_strip_html(self, source, chunk_size=65536, max_tag_length=65536):
+        """
+        Same as strip_html(), but takes a file object (read chunk_size characters at a time) or an iterable
+        of strings and yields the text in pieces, so documents of any size can be stripped in flat memory.
+        Tags split between chunks are handled; see HtmlStripper for max_tag_length.
+        """
+        stripper = HtmlStripper(max_tag_length)
+        for chunk in _iter_chunks(source, chunk_size):
+            text = stripper.feed(chunk)
+            if text:
+                yield text
+        text = stripper.close()
+        if text:
+            yield text
 
     def sql_date(self, yr=datetime.date.today().year, mt=datetime.date.today().month, dy=datetime.date.today().day, delimiter='/'):
         """
@@ -614,6 +1676,52 @@ class Tools:
         dateconverted = datetime.date(int(datelist[0]), int(datelist[1]), int(datelist[2]))
         return dateconverted
 
+    def strings_to_dates(self, strdates, as_datetime64=False):
+        """
+        Takes a sequence of YYYY/MM/DD or YYYY-MM-DD strings (e.g. a report column) and returns a list
+        of string_to_date() results, converting each distinct string only once.
+        If as_datetime64 is True, returns a NumPy datetime64[D] array instead, with NaT where
+        string_to_date() returns False - this needs NumPy. Zero-padded dates are converted with array
+        arithmetic over the whole column; any other strings go through string_to_date() as above.
+        """
+        if as_datetime64:
+            import numpy # optional, only needed for as_datetime64
+            strdates = numpy.asarray(list(strdates), dtype=unicode)
+            converted = numpy.empty(len(strdates), dtype='datetime64[D]')
+            if not len(strdates):
+                return converted
+            # rows shaped exactly like 2009/06/30 or 2009-06-30 are converted from their code points
+            codes = strdates.astype('U10').view(numpy.int32).reshape(len(strdates), 10)
+            digits = codes[:, [0, 1, 2, 3, 5, 6, 8, 9]] - ord('0')
+            fast = numpy.char.str_len(strdates) == 10
+            fast &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+            fast &= (codes[:, 4] == codes[:, 7]) & ((codes[:, 4] == ord('/')) | (codes[:, 4] == ord('-')))
+            year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+            month = digits[:, 4] * 10 + digits[:, 5]
+            day = digits[:, 6] * 10 + digits[:, 7]
+            months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+            firsts = months.astype('datetime64[D]')
+            lengths = ((months + 1).astype('datetime64[D]') - firsts).astype(numpy.int64)
+            # out-of-range values are left to string_to_date(), which raises its usual ValueError
+            fast &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= lengths)
+            converted[fast] = firsts[fast] + (day[fast] - 1)
+            slow = ~fast
+            if slow.any():
+                # anything else goes through string_to_date(), once per distinct string
+                positions = {}
+                values = []
+                indexes = []
+                for strdate in strdates[slow].tolist():
+                    position = positions.get(strdate)
+                    if position is None:
+                        position = positions[strdate] = len(values)
+                        dateconverted = self.string_to_date(strdate)
+                        values.append(numpy.datetime64('NaT') if dateconverted is False else dateconverted)
+                    indexes.append(position)
+                converted[slow] = numpy.array(values, dtype='datetime64[D]')[indexes]
+            return converted
+        return _map_memoized(self.string_to_date, strdates)
+
     def compare_dates(self, date1, date2):
         """
         Returns the number of days between date1 and date2
@@ -629,7 +1737,7 @@ class Tools:
         """
         Takes a YYYY/MM/DD date and returns the date string in MMM D, YYYY format
         """
-        months = ' January February March April May June July August September October November December'.split(' ')
+        months = month_names
         if '-' in uglydate:
             delimiter = '-'
         elif '/' in uglydate:
@@ -647,6 +1755,13 @@ class Tools:
         else:
             return unicode(uglydate)
 
+    def friendly_dates(self, uglydates, monthchars=3):
+        """
+        Takes a sequence of YYYY/MM/DD dates and returns a list of friendly_date() results,
+        formatting each distinct value only once
+        """
+        return _map_memoized(lambda uglydate: self.friendly_date(uglydate, monthchars), uglydates)
+
     def friendly_month(self, uglymonth):
         """
         Takes a YYYY/MM date and returns it in MMM, YYYY format
@@ -657,73 +1772,67 @@ class Tools:
             delimiter = '/'
         else:
             delimiter = '/'
-        months = ' January February March April May June July August September October November December'.split(' ')
+        months = month_names
         dt = uglymonth.split(delimiter)
         if len(dt) == 2:
             return '%s, %s' % (months[int(dt[1])], dt[0])
         else:
             return unicode(uglymonth)
 
+    def friendly_months(self, uglymonths):
+        """
+        Takes a sequence of YYYY/MM months and returns a list of friendly_month() results,
+        formatting each distinct value only once
+        """
+        return _map_memoized(self.friendly_month, uglymonths)
+
     def pcase(self, text, names=False):
         """
         Takes a string and returns it in proper case (initial caps)
         """
-        text = text.lower()
-        for char in ' -"\'':
-            text = char.join(self.capitalize(i) for i in text.split(char))
-        text = text.replace("'S ", "'s ") # fix incorrect capitalize on possessive s
-        if names==True:
-            text = 'Mc'.join(self.capitalize(i) for i in text.split('Mc'))
-            text = 'Mac'.join(self.capitalize(i) for i in text.split('Mac'))
-        return text.strip()
+        return _pcase(text, names)
+
+    def pcase_many(self, texts, names=False, cache=None):
+        """
+        Takes a sequence of strings (e.g. a customer name column) and returns a list of pcase() results.
+        Pass an LRUCache as cache to remember repeated values across calls, with bounded memory.
+        """
+        if cache is None:
+            return [_pcase(text, names) for text in texts]
+        names = names == True
+        output = []
+        addline = output.append
+        for text in texts:
+            key = (text, names)
+            result = cache.get(key)
+            if result is None:
+                result = _pcase(text, names)
+                cache.set(key, result)
+            addline(result)
+        return output
 
     def capitalize(self, text):
         """
         Capitalizes a word
         """
-        outstr = '' #initialize outstr
-        if len(text) > 0:
-            outstr = text[0].capitalize()
-            if len(text) > 1:
-                for c in text[1:]:
-                    outstr = outstr + c
-        return outstr
+        return text[:1].capitalize() + text[1:]
 
     def friendly_name(self, uname):
         """
         Takes a lowercase string with underscores _ between words and returns a string of capitalized words with spaces.
         """
-        uname = self.pcase(unicode(uname).replace('_',' '))
-
-        if len(uname) != 0:
-            finalname=[]
-            finalname.append(uname[0].upper())
-            for char in range(1,len(uname)):
-                if uname[char-1]==' ' or uname[char-1]=='-':
-                    finalname.append(uname[char].upper())
-                else:
-                    finalname.append(uname[char])
-            return ''.join(finalname)
-        else:
-            return uname
+        return name_converter.friendly(uname)
 
     def unfriendly_name(self, uname):
         """
         Takes a string of capitalized words with spaces and returns a lowercase string with underscores between words.
         """
-        uname = unicode(uname)
-        uname = uname.replace(' ','_')
-        uname = uname.lower()
-        uname = uname.replace('&#39;','')
-        badchars = ".,!?;/<>'\"(){}[]%"
-        outname = ''.join([c for c in uname if c not in badchars])
-        while '__' in outname:
-            outname = outname.replace('__','_')
-        return outname
+        return name_converter.unfriendly(uname)
 
     def random_id(self, prefix='id_'):
         """
         Returns a randomized id in the form 'form id_#######' for use in HTML elements that require a distinct id for DOM manipulation.
+        See IdAllocator for ids that are cheaper, never collide and don't change between requests.
         """
         import random
         return '%s%s' % (prefix, unicode(random.random()).replace('.',''))
@@ -732,17 +1841,15 @@ class Tools:
         """
         Takes a delimited string (any combination of whitespace, commas, and semicolons) and returns a list
         """
-        delimiters = ['\t', '\n', '\x0b', '\x0c', '\r', ',', ';', ' ']
+        return _split_list(astring) or ['']
 
-        for delim in delimiters:
-            astring = astring.replace(delim, ' ')
-
-        while '  ' in astring:
-            astring = astring.replace('  ', ' ')
-
-        astring = astring.strip()
-        alist = astring.split(' ')
-        return alist
+    def iter_tokens(self, source, chunk_size=65536):
+        """
+        Same as make_list_from_string(), but takes a file object (read chunk_size characters at a time)
+        or an iterable of strings and yields the items one at a time, so long ID or keyword lists
+        never have to be in memory at once. Empty input yields nothing rather than one empty string.
+        """
+        return _iter_tokens(source, chunk_size)
 
     def make_vertical(self, astring):
         """
@@ -752,6 +1859,616 @@ class Tools:
 
 
 
+class HtmlStripper:
+    """
+    Summary:
+    Removes HTML tags from text that arrives in chunks (e.g. from a file or a request body),
+    giving the same result as Tools.strip_html() on the whole text while only holding on to
+    an unfinished tag between chunks.
+
+    Parameters:
+    max_tag_length - a '<' that isn't closed within this many characters is kept as text,
+                     so memory stays bounded on broken input (default is 65536)
+
+    Methods:
+    feed(chunk) - takes the next chunk and returns the text that is ready, with tags removed
+    close() - returns any text still held back (an unclosed '<' is not a tag)
+    """
+
+    def __init__(self, max_tag_length=65536):
+        self.max_tag_length = max_tag_length
+        self._pending = ''
+
+    def feed(self, chunk):
+        """
+        Takes the next chunk of HTML and returns the text that is ready, with tags removed
+        """
+        text = self._pending + chunk
+        # everything up to the first '<' after the last '>' can be stripped now;
+        # from there on might be a tag that finishes in a later chunk
+        start = text.find('<', text.rfind('>') + 1)
+        if start == -1:
+            self._pending = ''
+            return _strip_html(text)
+        if len(text) - start > self.max_tag_length:
+            self._pending = ''
+            return '%s%s' % (_strip_html(text[:start]), text[start:])
+        self._pending = text[start:]
+        return _strip_html(text[:start])
+
+    def close(self):
+        """
+        Returns any text still held back - it never got a closing '>', so it isn't a tag
+        """
+        text = self._pending
+        self._pending = ''
+        return text
+
+
+class TextPipeline:
+    """
+    Summary:
+    Runs a chosen sequence of Tools text methods over a batch of strings, for bulk content imports.
+    Each step is still its own pass over the text, exactly as calling the Tools methods one by one,
+    so on a single process it is no faster than doing that (the steps already skip strings they have
+    nothing to do for, e.g. strip_html with no '<'). What it adds is process_many(), which can spread
+    a big import over several worker processes.
+
+    Parameters:
+    steps - list of step names, run in order: 'strip_html', 'fix_1252_codes', 'mark_it_up', 'pcase'
+            a step can also be any function that takes a string and returns a string
+            (default is ['strip_html', 'fix_1252_codes'])
+    names - passed on to the pcase step (default is False)
+
+    Methods:
+    process(text) - returns text run through every step
+    process_many(texts, workers, batch_size) - yields each text run through every step
+    """
+
+    def __init__(self, steps=['strip_html', 'fix_1252_codes'], names=False):
+        self.steps = list(steps)
+        self.names = names
+        functions = {
+            'strip_html': _strip_html,
+            'fix_1252_codes': _fix_1252_codes,
+            'mark_it_up': _mark_it_up,
+            'pcase': lambda text: _pcase(text, names),
+            }
+        self._functions = []
+        for step in self.steps:
+            if hasattr(step, '__call__'):
+                self._functions.append(step)
+            elif step in functions:
+                self._functions.append(functions[step])
+            else:
+                raise ValueError('unknown TextPipeline step: %s' % (step, ))
+
+    def process(self, text):
+        """
+        Takes a string and returns it run through every step
+        """
+        for function in self._functions:
+            text = function(text)
+        return text
+
+    def process_many(self, texts, workers=0, batch_size=1000):
+        """
+        Takes an iterable of strings and yields each one run through every step, in order.
+        If workers > 0, batches of batch_size strings are sent to that many worker processes
+        (steps must then be names or module-level functions, so they can be pickled).
+        """
+        if workers > 0:
+            for batch in _iter_parallel(_process_text_batch, (self.steps, self.names), _iter_batches(texts, batch_size), workers):
+                for text in batch:
+                    yield text
+        else:
+            process = self.process
+            for text in texts:
+                yield process(text)
+
+_worker_pipelines = {} # TextPipelines built in worker processes, keyed by steps and names
+
+def _process_text_batch(args, batch):
+    steps, names = args
+    key = (tuple(steps), names)
+    pipeline = _worker_pipelines.get(key)
+    if pipeline is None:
+        pipeline = _worker_pipelines[key] = TextPipeline(steps, names)
+    return [pipeline.process(text) for text in batch]
+
+
+friendly_name_pattern = re.compile(r'(?:^|(?<=[ \-])).', re.DOTALL) # first character and characters after a space or hyphen
+unfriendly_name_table = dict((ord(c), None) for c in ".,!?;/<>'\"(){}[]%") # characters unfriendly names leave out
+underscores_pattern = re.compile(r'__+')
+
+def _upper_match(match):
+    return match.group().upper()
+
+class NameConverter:
+    """
+    Summary:
+    Converts between field names like 'first_name' and titles like 'First Name' in both directions,
+    remembering recent conversions so forms and tables that use the same names on every page
+    don't work them out again. Tools.friendly_name() and Tools.unfriendly_name() use
+    name_converter, a module-level NameConverter.
+
+    Parameters:
+    maxsize - how many names to remember in each direction (default is 1024)
+
+    Methods:
+    friendly(uname) - same as Tools.friendly_name()
+    unfriendly(name) - same as Tools.unfriendly_name()
+    friendly_many(unames) - returns a list of friendly() results, e.g. for column headers
+    unfriendly_many(names) - returns a list of unfriendly() results
+    """
+
+    def __init__(self, maxsize=1024):
+        self.friendly_cache = LRUCache(maxsize)
+        self.unfriendly_cache = LRUCache(maxsize)
+
+    def friendly(self, uname):
+        """
+        Takes a lowercase string with underscores _ between words and returns a string of capitalized words with spaces.
+        """
+        uname = unicode(uname)
+        name = self.friendly_cache.get(uname)
+        if name is None:
+            name = friendly_name_pattern.sub(_upper_match, _pcase(uname.replace('_', ' ')))
+            self.friendly_cache.set(uname, name)
+        return name
+
+    def unfriendly(self, name):
+        """
+        Takes a string of capitalized words with spaces and returns a lowercase string with underscores between words.
+        """
+        name = unicode(name)
+        uname = self.unfriendly_cache.get(name)
+        if uname is None:
+            uname = name.replace(' ', '_').lower().replace('&#39;', '').translate(unfriendly_name_table)
+            uname = underscores_pattern.sub('_', uname)
+            self.unfriendly_cache.set(name, uname)
+        return uname
+
+    def friendly_many(self, unames):
+        """
+        Takes a sequence of names and returns a list of friendly() results
+        """
+        friendly = self.friendly
+        return [friendly(uname) for uname in unames]
+
+    def unfriendly_many(self, names):
+        """
+        Takes a sequence of titles and returns a list of unfriendly() results
+        """
+        unfriendly = self.unfriendly
+        return [unfriendly(name) for name in names]
+
+name_converter = NameConverter()
+
+
+class PasswordPolicy:
+    """
+    Summary:
+    A set of password rules, worked out once and then checked quickly against any number of
+    passwords - e.g. for bulk account imports. Tools.validate_password() uses one of these,
+    and the messages are the same.
+
+    Parameters:
+    minlen - minimum length (default is 8)
+    maxlen - maximum length (default is 40)
+    min_groups - how many character groups must be used, out of lowercase letters, uppercase letters,
+                 numerals and anything else, from 0 to 4 (default is 0; validate_password's strict mode is 3)
+    username - 'same' rejects a password equal to the username, 'contains' also rejects one
+               that contains it ignoring case, None allows both (default is 'same')
+
+    Methods:
+    validate(username, password1, password2=None) - returns True, or a message saying what's wrong
+        (password2 is the confirmation field; leave it out to skip that check)
+    validate_many(rows) - takes (username, password) or (username, password1, password2) tuples
+        and yields validate() for each one
+    """
+
+    groups = ('abcdefghijklmnopqrstuvwxyz', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', '0123456789')
+    group_names = 'lowercase letters, uppercase letters, numerals, and other symbols'
+    numbers = ('zero', 'one', 'two', 'three', 'four')
+
+    def __init__(self, minlen=8, maxlen=40, min_groups=0, username='same'):
+        if username not in ('same', 'contains', None):
+            raise ValueError('unknown PasswordPolicy username rule: %s' % (username, ))
+        if not 0 <= min_groups <= len(self.groups) + 1:
+            raise ValueError('PasswordPolicy min_groups must be from 0 to %s, got %s' % (len(self.groups) + 1, min_groups))
+        self.minlen = minlen
+        self.maxlen = maxlen
+        self.min_groups = min_groups
+        self.username = username
+        self._group_sets = [frozenset(group) for group in self.groups]
+        self._known = frozenset(''.join(self.groups))
+        self._messages = {
+            'match': 'Entered passwords do not match',
+            'minlen': 'Password must be at least %s characters in length' % minlen,
+            'maxlen': 'Password cannot be more than %s characters in length' % maxlen,
+            'same': 'Password must not be the same as username',
+            'contains': 'Password must not contain username',
+            'groups': 'Password must contain characters from at least %s of the following character groups: %s.' % (
+                self.numbers[min_groups], self.group_names),
+            }
+
+    def count_groups(self, password):
+        """
+        Returns how many of the four character groups password uses
+        """
+        chars = set(password)
+        count = 0 if chars <= self._known else 1
+        for group in self._group_sets:
+            if not chars.isdisjoint(group):
+                count += 1
+        return count
+
+    def validate(self, username, password1, password2=None):
+        """
+        Returns True if the password passes every rule, or the message for the first rule it fails
+        """
+        if password2 is not None and password1 != password2:
+            return self._messages['match']
+        length = len(password1)
+        if length < self.minlen:
+            return self._messages['minlen']
+        if length > self.maxlen:
+            return self._messages['maxlen']
+        if self.username is not None:
+            if password1 == username:
+                return self._messages['same']
+            if self.username == 'contains' and username and username.lower() in password1.lower():
+                return self._messages['contains']
+        if self.min_groups and self.count_groups(password1) < self.min_groups:
+            return self._messages['groups']
+        return True
+
+    def validate_many(self, rows):
+        """
+        Takes an iterable of (username, password) or (username, password1, password2) tuples
+        and yields validate() for each one, in order
+        """
+        validate = self.validate
+        for row in rows:
+            yield validate(*row)
+
+password_policies = LRUCache(maxsize=16) # PasswordPolicy objects used by Tools.validate_password
+
+
+class PasswordHasher:
+    """
+    Summary:
+    Hashes and checks passwords with a slow, salted key derivation function from hashlib
+    (scrypt where available, otherwise PBKDF2-HMAC-SHA256), replacing Tools.make_hash().
+    Hashes are stored as self-describing strings, e.g. '$scrypt$n=16384,p=1,r=8$<salt>$<hash>'
+    or '$pbkdf2-sha256$i=600000$<salt>$<hash>', so the cost can be raised later without
+    breaking existing hashes. Old make_hash() digests are still accepted by verify() and are
+    flagged by needs_rehash(), so they can be upgraded the next time the user logs in.
+
+    Parameters:
+    algorithm - 'scrypt' or 'pbkdf2' (default is scrypt if hashlib has it, otherwise pbkdf2)
+    n, r, p - scrypt cost parameters (default is n=16384, r=8, p=1)
+    iterations - PBKDF2 iteration count (default is 600000)
+    salt_size - bytes of random salt per hash (default is 16)
+    workers - size of the thread pool used by verify_async() (default is 4)
+    legacy_salt, legacy_type - the salt and type old make_hash() digests were made with
+                               (default is 'saltydog', 'md4')
+
+    Methods:
+    hash(password) - returns an encoded hash for a new password
+    verify(password, encoded) - returns True if password matches encoded (new or legacy format)
+    needs_rehash(encoded) - returns True if encoded is legacy or made with other settings
+    verify_and_update(password, encoded) - returns (ok, new_encoded), new_encoded is None unless
+                                           the password matched and should be stored again
+    verify_async(password, encoded) - runs verify() in the thread pool and returns a
+                                      concurrent.futures.Future; under asyncio, await
+                                      asyncio.wrap_future(hasher.verify_async(...))
+    calibrate(target_seconds) - sets the cost so one hash takes about target_seconds here
+    shutdown() - stops the thread pool, if one was started
+    """
+
+    def __init__(self, algorithm=None, n=16384, r=8, p=1, iterations=600000, salt_size=16,
+        workers=4, legacy_salt='saltydog', legacy_type='md4'):
+        if algorithm is None:
+            algorithm = 'scrypt' if hasattr(hashlib, 'scrypt') else 'pbkdf2'
+        if algorithm not in ('scrypt', 'pbkdf2'):
+            raise ValueError('unknown PasswordHasher algorithm: %s' % (algorithm, ))
+        if algorithm == 'scrypt' and not hasattr(hashlib, 'scrypt'):
+            raise ValueError('hashlib.scrypt is not available in this Python')
+        self.algorithm = algorithm
+        self.n = n
+        self.r = r
+        self.p = p
+        self.iterations = iterations
+        self.salt_size = salt_size
+        self.workers = workers
+        self.legacy_salt = legacy_salt
+        self.legacy_type = legacy_type
+        self._executor = None
+
+    def _derive(self, algorithm, password, salt, params, size=32):
+        if not isinstance(password, bytes):
+            password = password.encode('utf-8')
+        if algorithm == 'scrypt':
+            n, r, p = params['n'], params['r'], params['p']
+            return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256*n*r*p + 1048576, dklen=size)
+        return hashlib.pbkdf2_hmac('sha256', password, salt, params['i'], size)
+
+    def _params(self):
+        if self.algorithm == 'scrypt':
+            return {'n': self.n, 'r': self.r, 'p': self.p}
+        return {'i': self.iterations}
+
+    def _parse(self, encoded):
+        """
+        Returns (algorithm, params, salt, digest) for an encoded hash, or None if it isn't one
+        """
+        parts = encoded.split('$')
+        if len(parts) != 5 or parts[0] != '' or parts[1] not in ('scrypt', 'pbkdf2-sha256'):
+            return None
+        try:
+            params = dict((key, int(value)) for key, value in (item.split('=') for item in parts[2].split(',')))
+            salt = binascii.unhexlify(parts[3])
+            digest = binascii.unhexlify(parts[4])
+        except (ValueError, TypeError, binascii.Error):
+            return None
+        return ('scrypt' if parts[1] == 'scrypt' else 'pbkdf2', params, salt, digest)
+
+    def hash(self, password):
+        """
+        Takes a plain text password and returns an encoded, salted hash
+        """
+        salt = os.urandom(self.salt_size)
+        params = self._params()
+        digest = self._derive(self.algorithm, password, salt, params)
+        return '$%s$%s$%s$%s' % (
+            'scrypt' if self.algorithm == 'scrypt' else 'pbkdf2-sha256',
+            ','.join('%s=%s' % (key, params[key]) for key in sorted(params)),
+            binascii.hexlify(salt).decode('ascii'),
+            binascii.hexlify(digest).decode('ascii'),
+            )
+
+    def verify(self, password, encoded):
+        """
+        Returns True if password matches encoded, which can be a hash() string or an old make_hash() digest.
+        A bytes password is taken as UTF-8, as hash() takes it. Digests are compared in constant time.
+        """
+        parsed = self._parse(encoded)
+        if parsed is None:
+            if isinstance(password, bytes):
+                try:
+                    password = password.decode('utf-8')
+                except UnicodeDecodeError:
+                    return False # hash() would have encoded any text password as valid UTF-8
+            expected = Tools().make_hash(password, self.legacy_salt, self.legacy_type)
+            return hmac.compare_digest(expected.encode('ascii'), encoded.upper().encode('ascii', 'replace'))
+        algorithm, params, salt, digest = parsed
+        try:
+            candidate = self._derive(algorithm, password, salt, params, len(digest))
+        except (KeyError, ValueError):
+            return False
+        return hmac.compare_digest(candidate, digest)
+
+    def needs_rehash(self, encoded):
+        """
+        Returns True if encoded is an old make_hash() digest or was made with other settings than these
+        """
+        parsed = self._parse(encoded)
+        if parsed is None:
+            return True
+        algorithm, params, salt, digest = parsed
+        return algorithm != self.algorithm or params != self._params() or len(salt) != self.salt_size
+
+    def verify_and_update(self, password, encoded):
+        """
+        Checks a login and returns (ok, new_encoded). new_encoded is a fresh hash() of the password
+        when it matched and encoded needs_rehash(), so it can be saved over the old one - otherwise None.
+        """
+        if not self.verify(password, encoded):
+            return (False, None)
+        if self.needs_rehash(encoded):
+            return (True, self.hash(password))
+        return (True, None)
+
+    def verify_async(self, password, encoded):
+        """
+        Runs verify() in a thread pool (hashlib releases the GIL while hashing) and returns a
+        concurrent.futures.Future - call .result() on it, or await asyncio.wrap_future() of it
+        """
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor # Python 3, or the futures backport on Python 2
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(self.verify, password, encoded)
+
+    def shutdown(self):
+        """
+        Stops the verify_async() thread pool, if one was started
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def calibrate(self, target_seconds=0.25, max_n=1048576):
+        """
+        Sets the cost (n for scrypt, iterations for PBKDF2) so that one hash takes about
+        target_seconds on this machine, and returns the new settings
+        """
+        password, salt = b'calibrate', os.urandom(self.salt_size)
+        if self.algorithm == 'scrypt':
+            n = 1024
+            while n < max_n:
+                started = time.time()
+                self._derive('scrypt', password, salt, {'n': n, 'r': self.r, 'p': self.p})
+                if time.time() - started >= target_seconds / 2.0:
+                    break
+                n *= 2
+            self.n = n
+        else:
+            started = time.time()
+            self._derive('pbkdf2', password, salt, {'i': 10000})
+            elapsed = max(time.time() - started, 1e-6)
+            self.iterations = max(10000, int(10000 * target_seconds / elapsed))
+        return self._params()
+
+
+class FormLayout:
+    """
+    Summary:
+    The tags a form is written with. Pass the same layout to Formfield.write() and Form.write() and each
+    field is written straight into its final markup, instead of being written as a table and then rewritten
+    across the whole form by Form.write(). The module has three:
+
+    table_layout - the same markup as Form.write(table=True)
+    container_layout - the same markup as Form.write(table=False), with formcontainer/formitem tags
+    legacy_layout - the table markup with formitem wrappers that Form.write() rewrites (Formfield's default)
+
+    Parameters:
+    container, body, item, head, cell - tags used in place of table, tbody, tr, th and td
+    colspan - attribute on cells that span the whole form (default is 'colspan="2"')
+    group - tag wrapped around radio, checkbox and two-line textarea fields (default is 'formitem'),
+            or None to leave the blank lines Form.write(table=True) leaves where it removes them
+    """
+
+    def __init__(self, container='table', body='tbody', item='tr', head='th', cell='td', colspan='colspan="2"', group='formitem'):
+        self.container = container
+        self.body = body
+        self.item = item
+        self.head = head
+        self.cell = cell
+        self.colspan = colspan
+        self.group = group
+
+    def group_start(self, id, classname, kind):
+        """
+        Returns the line that opens a group of rows
+        """
+        if self.group is None:
+            return '  '
+        return '  <%s id="%s_item" class="%s_item %s">' % (self.group, id, classname, kind)
+
+    def group_end(self):
+        """
+        Returns the line that closes a group of rows
+        """
+        if self.group is None:
+            return ''
+        return '</%s>' % self.group
+
+legacy_layout = FormLayout()
+table_layout = FormLayout(group=None)
+container_layout = FormLayout('formcontainer', 'formcontainerbody', 'formitem', 'formitemhead', 'formitembody', colspan='', group='formitem')
+
+
+def _splice(html, offsets, marker):
+    # returns html with marker inserted at each of the (ascending) offsets
+    if not offsets:
+        return html
+    pieces = []
+    last = 0
+    for offset in offsets:
+        pieces.append(html[last:offset])
+        pieces.append(marker)
+        last = offset
+    pieces.append(html[last:])
+    return ''.join(pieces)
+
+def _write_select_options(options, value, retainstate):
+    # one-off rendering of a plain option list - building an OptionSet only pays when it is reused
+    value = unicode(value)
+    retain = retainstate != ''
+    lines = []
+    addline = lines.append
+    for option in options:
+        if option.__class__() == []:
+            option_value, option_text = option[0], option[1]
+        else:
+            option_value, option_text = option, option
+        selected = ''
+        if retain and unicode(option_value) == value:
+            selected = ' selected'
+        addline('        <option value="%s"%s>%s</option>' % (option_value, selected, option_text))
+    return '\n'.join(lines)
+
+class OptionSet:
+    """
+    Summary:
+    A list of options for select, radio and checkbox Formfields that is rendered once and then reused:
+    the option markup is kept along with where each value's ' selected' or ' checked' goes, so writing
+    the field for a given value only splices that in. Build one for long lists (countries, time zones)
+    and pass it to Formfield.write() as options. Output is the same as passing the plain list.
+
+    Parameters:
+    options - list of option values; an option can be a list: option[0] is the value and option[1] is the text
+
+    Methods:
+    write_select(value, retainstate) - returns the <option> lines for a select
+    write_inputs(widget, id, classname, value, retainstate, layout) - returns the rows for a 'radio'
+        or 'checkbox' field; these depend on the field id, so the last few are cached
+    """
+
+    def __init__(self, options=[]):
+        self.options = list(options)
+        self._select = None
+        self._inputs = LRUCache(maxsize=16)
+
+    def write_select(self, value='', retainstate='true'):
+        """
+        Returns the <option> lines for a select, with the option(s) matching value selected
+        """
+        if self._select is None:
+            lines = []
+            offsets = {}
+            position = 0
+            for option in self.options:
+                if option.__class__() == []:
+                    key, start, end = option[0], '        <option value="%s"' % (option[0], ), '>%s</option>' % (option[1], )
+                else:
+                    key, start, end = option, '        <option value="%s"' % (option, ), '>%s</option>' % (option, )
+                offsets.setdefault(unicode(key), []).append(position + len(start))
+                line = start + end
+                lines.append(line)
+                position += len(line) + 1
+            self._select = ('\n'.join(lines), offsets)
+        html, offsets = self._select
+        if retainstate == '':
+            return html
+        return _splice(html, offsets.get(unicode(value)), ' selected')
+
+    def write_inputs(self, widget, id, classname='', value='', retainstate='true', layout=None):
+        """
+        Returns the rows for a 'radio' or 'checkbox' field, with the option(s) matching value checked
+        """
+        if layout is None: layout = legacy_layout
+        key = (widget, id, classname, layout)
+        compiled = self._inputs.get(key)
+        if compiled is None:
+            item, cell, colspan = layout.item, layout.cell, layout.colspan
+            row_start = '  <%s id="%s_body" class="%s_body %s_body">\n    <%s %s class="%s">\n' % (item, id, classname, widget, cell, colspan, classname)
+            row_end = '\n      </label>\n    </%s>\n  </%s>' % (cell, item)
+            lines = []
+            offsets = {}
+            position = 0
+            for option in self.options:
+                if isinstance(option, list):
+                    option_value, option_text = option[0], option[1]
+                else:
+                    option_value, option_text = option, option
+                option_id = name_converter.unfriendly(option_value)
+                start = '%s      <label for="%s_%s" id="for_%s_%s">\n        <input type="%s" name="%s" id="%s_%s" value="%s"' % (
+                    row_start, id, option_id, id, option_id, widget, id, id, option_id, option_value)
+                offsets.setdefault(unicode(option_value), []).append(position + len(start))
+                line = '%s>\n%s%s' % (start, '        %s' % (option_text), row_end)
+                lines.append(line)
+                position += len(line) + 1
+            compiled = ('\n'.join(lines), offsets)
+            self._inputs.set(key, compiled)
+        html, offsets = compiled
+        if retainstate == '':
+            return html
+        return _splice(html, offsets.get(unicode(value)), ' checked')
+
+
 class Form:
     """
     Summary:
@@ -759,13 +2476,16 @@ class Form:
 
     Parameters:
 
-    Id - form id attribute (default is random id)
+    Id - form id attribute (default is the next id from ids)
     Name - form name attribute (default is id)
     Class - form class attribute
     Title - optional form title displayed as an H3 element above the form
     Method - form method attribute ('post' or 'get')
     Action - form action (destination URL) attribute
     Enctype - form enctype attribute (default is 'application/x-www-form-urlencoded'; use 'multipart/form-data' for file uploads
+    Ids - IdAllocator to take a default id from (default is element_ids)
+    Layout - FormLayout the formfields were written in (default is None: the formfields are in legacy_layout
+             and the form is rewritten to a table, or to formcontainer tags if Table is False)
     """
 
     def __init__(self):
@@ -797,13 +2517,12 @@ class Form:
             x += order*-1
         return options
 
-    def write(self, formfields = [], id='', name='', classname='', title='', method='post', action='', enctype='application/x-www-form-urlencoded', table=True):
+    def write(self, formfields = [], id='', name='', classname='', title='', method='post', action='', enctype='application/x-www-form-urlencoded', table=True, ids=None, layout=None):
         atts = {}
         output = []
         addline = output.append
-        tools = Tools()
 
-        if id == '': id = tools.random_id()
+        if id == '': id = (ids or element_ids).next_id()
         atts['id'] = id
 
         if name == '': name = id
@@ -825,6 +2544,18 @@ class Form:
         attstring = ''.join(attlist)
         addline('<form%s>' % attstring)
 
+        if layout is not None:
+            # the formfields are already in their final markup, so there's nothing to rewrite
+            addline('<%s>' % layout.container)
+            if title != '':
+                 addline('<caption id="%s_caption">%s</caption>\n' % (id, title))
+            addline('<%s id="%s_tbody">' % (layout.body, id))
+            addline('\n'.join(formfields))
+            addline('</%s>' % layout.body)
+            addline('</%s>' % layout.container)
+            addline('</form>')
+            return '\n'.join(output)
+
         addline('<table>')
         if title != '':
              addline('<caption id="%s_caption">%s</caption>\n' % (id, title))
@@ -867,13 +2598,13 @@ class Formfield:
 
     Parameters:
     widget        - type of form element (e.g. input, select, textarea)
-    id            - id attribute (default is random id)
+    id            - id attribute (default is the next id from ids)
     name          - name attribute (default is id)
     classname     - formfield class attribute
     title         - optional formfield title (default is formatted id)
     disabled      - formfield disabled attribute (default is false)
     retainstate   - retain value on submit (default is true)
-    options       - list of select formfield options
+    options       - list of select, radio or checkbox formfield options, or an OptionSet
                     an option can be a list: option[0] is the value and option[1] is the text
     leadingoption - first select option is blank (default is false)
     value         - default formfield value
@@ -882,24 +2613,28 @@ class Formfield:
     options       - list of select formfield option values
     rows          - number of rows for a textarea
     cols          - number of cols for a textarea
+    ids           - IdAllocator to take a default id from (default is element_ids)
+    layout        - FormLayout to write the field in (default is legacy_layout, which Form.write() rewrites)
     """
 
     def __init__(self):
         pass
 
-    def write(self, widget='input', id='', name='', classname='', title='', disabled='', retainstate='true', options = [], leadingoption='', value='', multiple='', type='text', visible=False, rows=10, cols=40, twolines=False):
+    def write(self, widget='input', id='', name='', classname='', title='', disabled='', retainstate='true', options = [], leadingoption='', value='', multiple='', type='text', visible=False, rows=10, cols=40, twolines=False, ids=None, layout=None):
         output = []
         addline = output.append
         atts = {}
         tools = Tools()
+        if layout is None: layout = legacy_layout
+        item, head, cell, colspan = layout.item, layout.head, layout.cell, layout.colspan
 
-        if id == '': id = tools.random_id()
+        if id == '': id = (ids or element_ids).next_id()
         atts['id'] = id
 
         if name == '': name = id
         atts['name'] = name
 
-        if title == '': title = tools.friendly_name(id)
+        if title == '': title = name_converter.friendly(id)
 
         if disabled != '': atts['disabled'] = 'disabled'
         if classname != '': atts['class'] = classname
@@ -909,24 +2644,19 @@ class Formfield:
             if multiple != '':
                 atts['Multiple'] = 'multiple'
             ats = "".join([' %s="%s"' % (k, v) for k, v in atts.items()])
-            addline('  <tr id="%s_item" class="%s_item select_item">' % (id, classname))
-            addline('    <th title="%s">%s</th>' % (title, title))
-            addline('    <td title="%s">' % (title))
+            addline('  <%s id="%s_item" class="%s_item select_item">' % (item, id, classname))
+            addline('    <%s title="%s">%s</%s>' % (head, title, title, head))
+            addline('    <%s title="%s">' % (cell, title))
             addline('      <select%s>' % (ats))
 
             if leadingoption != '':
                 addline('        <option value="">--</option>')
-            for option in options:
-                selected = ''
-                if option.__class__() == []:
-                    if retainstate != '' and unicode(option[0]) == unicode(value):
-                        selected = ' selected'
-                    addline('        <option value="%s"%s>%s</option>' % (option[0], selected, option[1]))
-                else:
-                    if retainstate != '' and unicode(option) == unicode(value):
-                        selected = ' selected'
-                    addline('        <option value="%s"%s>%s</option>' % (option, selected, option))
-            addline('      </select>\n    </td>\n  </tr>')
+            if isinstance(options, OptionSet):
+                if options.options: addline(options.write_select(value, retainstate))
+            else:
+                html = _write_select_options(options, value, retainstate)
+                if html: addline(html)
+            addline('      </select>\n    </%s>\n  </%s>' % (cell, item))
 
         # INPUT widget
         elif widget == 'input':
@@ -938,79 +2668,43 @@ class Formfield:
                 atts['type'] = type
             ats = "".join([' %s="%s"' % (k, v) for k, v in atts.items()])
             if type == 'hidden' and visible == False:
-                addline('  <tr style="display: none"><td><input%s></td></tr>' % (ats))
+                addline('  <%s style="display: none"><%s><input%s></%s></%s>' % (item, cell, ats, cell, item))
             else:
-                addline('  <tr id="%s_item" class="%s_item %s_item">' % (id, classname, type))
+                addline('  <%s id="%s_item" class="%s_item %s_item">' % (item, id, classname, type))
                 if type != 'submit':
-                    addline('    <th title="%s">%s</th>\n    <td title="%s">' % (title, title, title))
+                    addline('    <%s title="%s">%s</%s>\n    <%s title="%s">' % (head, title, title, head, cell, title))
                 else:
-                    addline('    <td colspan="2" title = "%s" class="%s_form_button">' % (title, classname))
+                    addline('    <%s %s title = "%s" class="%s_form_button">' % (cell, colspan, title, classname))
                 addline('      <input%s>' % (ats))
                 if type == 'hidden' and visible != False: addline(value)
-                addline('    </td>')
-                addline('  </tr>')
+                addline('    </%s>' % (cell))
+                addline('  </%s>' % (item))
 
         # RADIO widget - radio buttons are a type of input but they behave quite differently
         elif widget == 'radio':
-            addline('  <formitem id="%s_item" class="%s_item radio_item">' % (id, classname))
-            addline('  <tr id="%s_head" class="%s_head radio_head">' % (id, classname))
-            addline('    <th colspan="2" class="radio_title" id="radio_title_%s">%s</th>' % (
-                id, title
+            addline(layout.group_start(id, classname, 'radio_item'))
+            addline('  <%s id="%s_head" class="%s_head radio_head">' % (item, id, classname))
+            addline('    <%s %s class="radio_title" id="radio_title_%s">%s</%s>' % (
+                head, colspan, id, title, head
                 )
             )
-            addline('  </tr>')
-            for option in options:
-                if isinstance(option, list):
-                    option_value, option_text = option[0], option[1]
-                else:
-                    option_value, option_text = option, option
-                checked = ''
-                if retainstate != '' and unicode(option_value) == unicode(value):
-                    checked = ' checked'
-                addline('  <tr id="%s_body" class="%s_body radio_body">' % (id, classname))
-                addline('    <td colspan="2" class="%s">' % (classname))
-                addline('      <label for="%s_%s" id="for_%s_%s">' % (
-                    id, tools.unfriendly_name(option_value), id, tools.unfriendly_name(option_value), )
-                )
-                addline('        <input type="radio" name="%s" id="%s_%s" value="%s"%s>' % (
-                    id, id, tools.unfriendly_name(option_value), option_value, checked)
-                )
-                addline('        %s' % (option_text))
-                addline('      </label>')
-                addline('    </td>')
-                addline('  </tr>')
-            addline('</formitem>')
+            addline('  </%s>' % (item))
+            if not isinstance(options, OptionSet): options = OptionSet(options)
+            if options.options: addline(options.write_inputs('radio', id, classname, value, retainstate, layout))
+            addline(layout.group_end())
 
         # CHECKBOX widget - checkboxes are a type of input but they behave quite differently
         elif widget == 'checkbox':
-            addline('  <formitem id="%s_item" class="%s_item checkbox_item">' % (id, classname))
-            addline('  <tr id="%s_head" class="%s_head checkbox_head">' % (id, classname))
-            addline('    <th colspan="2" class="checkbox_title" id="checkbox_title_%s">%s</th>' % (
-                id, title
+            addline(layout.group_start(id, classname, 'checkbox_item'))
+            addline('  <%s id="%s_head" class="%s_head checkbox_head">' % (item, id, classname))
+            addline('    <%s %s class="checkbox_title" id="checkbox_title_%s">%s</%s>' % (
+                head, colspan, id, title, head
                 )
             )
-            addline('  </tr>')
-            for option in options:
-                if isinstance(option, list):
-                    option_value, option_text = option[0], option[1]
-                else:
-                    option_value, option_text = option, option
-                checked = ''
-                if retainstate != '' and unicode(option_value) == unicode(value):
-                    checked = ' checked'
-                addline('  <tr id="%s_body" class="%s_body checkbox_body">' % (id, classname))
-                addline('    <td colspan="2" class="%s">' % (classname))
-                addline('      <label for="%s_%s" id="for_%s_%s">' % (
-                    id, tools.unfriendly_name(option_value), id, tools.unfriendly_name(option_value), )
-                )
-                addline('        <input type="checkbox" name="%s" id="%s_%s" value="%s"%s>' % (
-                    id, id, tools.unfriendly_name(option_value), option_value, checked)
-                )
-                addline('        %s' % (option_text))
-                addline('      </label>')
-                addline('    </td>')
-                addline('  </tr>')
-            addline('</formitem>')
+            addline('  </%s>' % (item))
+            if not isinstance(options, OptionSet): options = OptionSet(options)
+            if options.options: addline(options.write_inputs('checkbox', id, classname, value, retainstate, layout))
+            addline(layout.group_end())
 
         # TEXTAREA widget
         elif widget == 'textarea':
@@ -1020,33 +2714,131 @@ class Formfield:
                 atts['cols'] = cols
             ats = "".join([' %s="%s"' % (k, v) for k, v in atts.items()])
             if twolines == True:
-                addline('  <formitem id="%s_item" class="%s_item checkbox_item">' % (id, classname))
-                addline('  <tr id="%s_head" class="%s_head textarea_head">' % (id, classname))
-                addline('    <th colspan="2" title="%s">%s</th>' % (title, title))
-                addline('  </tr>')
-                addline('  <tr id="%s_body" class="%s_head textarea_body">' % (id, classname))
-                addline('    <td colspan="2" title = "%s" class="form_textarea">' % (title))                
+                addline(layout.group_start(id, classname, 'checkbox_item'))
+                addline('  <%s id="%s_head" class="%s_head textarea_head">' % (item, id, classname))
+                addline('    <%s %s title="%s">%s</%s>' % (head, colspan, title, title, head))
+                addline('  </%s>' % (item))
+                addline('  <%s id="%s_body" class="%s_head textarea_body">' % (item, id, classname))
+                addline('    <%s %s title = "%s" class="form_textarea">' % (cell, colspan, title))
                 addline('      <textarea%s>%s</textarea>' % (ats, value))
-                addline('    </td>')
-                addline('  </tr>')
-                addline('</formitem>')
+                addline('    </%s>' % (cell))
+                addline('  </%s>' % (item))
+                addline(layout.group_end())
             else:
-                addline('  <tr id="%s_head" class="%s_head textarea_item">' % (id, classname))
-                addline('    <th title="%s">%s</th>' % (tools.strip_html(title), title))
-                addline('    <td title="%s">' % (tools.strip_html(title)))
+                addline('  <%s id="%s_head" class="%s_head textarea_item">' % (item, id, classname))
+                addline('    <%s title="%s">%s</%s>' % (head, tools.strip_html(title), title, head))
+                addline('    <%s title="%s">' % (cell, tools.strip_html(title)))
                 addline('      <textarea%s>%s</textarea>' % (ats, value))
-                addline('    </td>')
-                addline('  </tr>')
+                addline('    </%s>' % (cell))
+                addline('  </%s>' % (item))
 
         # separator widget
         elif widget == 'separator':
-            addline('  <tr id="%s_item" class="%s_item separator_item">' % (id, classname))
-            addline('    <th colspan="2" title="%s">%s</th>' % (title, title))
-            addline('  </tr>')
+            addline('  <%s id="%s_item" class="%s_item separator_item">' % (item, id, classname))
+            addline('    <%s %s title="%s">%s</%s>' % (head, colspan, title, title, head))
+            addline('  </%s>' % (item))
 
         return '\n'.join(output)
 
 
+form_value_slot = '\x00quandy-value\x00' # stands in for the value while a FormSchema is compiled
+# ids for schema fields and forms that don't have one: counted once for the whole process, not per
+# thread or request like element_ids, because a schema built once is rendered into many pages
+schema_ids = itertools.count(1)
+
+def _schema_id():
+    return 'schema_%d' % next(schema_ids)
+
+class FormSchema:
+    """
+    Summary:
+    A form described once as a list of field specs and compiled into a render plan: each field is
+    written once with Formfield.write() and kept as fixed markup with slots for its value (or, for
+    select, radio and checkbox fields, a pre-rendered OptionSet). Each request then only fills in
+    the current values and any error messages. Output is the same as writing every field with
+    Formfield.write() and the form with Form.write(), using the same layout.
+
+    Parameters:
+    fields - list of dictionaries of Formfield.write() parameters, e.g. {'widget': 'select', 'id': 'size', 'options': [...]}
+             fields without an id get one ('schema_1', 'schema_2', ...) when the schema is built, so it
+             stays the same and never repeats a default element id on the page it is rendered into
+    form - dictionary of Form.write() parameters (id, name, classname, title, method, action, enctype)
+           (a form without an id gets one the same way)
+    layout - FormLayout to write the form in (default is table_layout)
+
+    Methods:
+    render(values, errors) - returns the form HTML
+        values - dictionary of field name: value (fields not in it get the value from their spec)
+        errors - dictionary of field name: message, written as an extra row after the field
+    """
+
+    def __init__(self, fields=[], form=None, layout=None):
+        if layout is None: layout = table_layout
+        self.layout = layout
+        self.fields = []
+        self._plan = []
+        formfield = Formfield()
+        for spec in fields:
+            spec = dict(spec)
+            spec['layout'] = layout
+            if spec.get('id', '') == '': spec['id'] = _schema_id()
+            if spec.get('name', '') == '': spec['name'] = spec['id']
+            self.fields.append(spec)
+            self._plan.append(self._compile_field(formfield, spec))
+        form = dict(form or {})
+        if form.get('id', '') == '': form['id'] = _schema_id()
+        form['layout'] = layout
+        self.form = form
+        self._head, self._tail = Form().write([form_value_slot], **form).split(form_value_slot)
+
+    def _compile_field(self, formfield, spec):
+        widget = spec.get('widget', 'input')
+        default = spec.get('value', '')
+        if widget in ('select', 'radio', 'checkbox'):
+            options = spec.get('options', [])
+            if not isinstance(options, OptionSet): options = OptionSet(options)
+            html = formfield.write(**dict(spec, options=[]))
+            if widget == 'select':
+                split = html.rfind('\n      </select>')
+            else:
+                split = html.rfind('\n')
+            return (widget, spec, default, options, html[:split], html[split:])
+        # the value only appears as itself, except that input fields leave out value="" when it's empty
+        empty = formfield.write(**dict(spec, value=''))
+        fragments = formfield.write(**dict(spec, value=form_value_slot)).split(form_value_slot)
+        return (widget, spec, default, None, empty, fragments)
+
+    def _error_row(self, spec, message):
+        layout = self.layout
+        return '  <%s id="%s_error" class="%s_error form_error">\n    <%s %s class="form_error">%s</%s>\n  </%s>' % (
+            layout.item, spec['id'], spec.get('classname', ''), layout.cell, layout.colspan, message, layout.cell, layout.item)
+
+    def render(self, values=None, errors=None):
+        """
+        Returns the form HTML with values filled in and errors added after their fields
+        """
+        values = values or {}
+        output = []
+        addline = output.append
+        for widget, spec, default, options, head, tail in self._plan:
+            value = values.get(spec['name'], default)
+            if options is None:
+                if value == '':
+                    addline(head)
+                else:
+                    addline(('%s' % (value, )).join(tail))
+            elif not options.options:
+                addline('%s%s' % (head, tail))
+            elif widget == 'select':
+                addline('%s\n%s%s' % (head, options.write_select(value, spec.get('retainstate', 'true')), tail))
+            else:
+                addline('%s\n%s%s' % (head, options.write_inputs(widget, spec['id'], spec.get('classname', ''), value,
+                    spec.get('retainstate', 'true'), self.layout), tail))
+            if errors and spec['name'] in errors:
+                addline(self._error_row(spec, errors[spec['name']]))
+        return '%s%s%s' % (self._head, '\n'.join(output), self._tail)
+
+
 class Handler:
     """
     Summary:
@@ -1088,9 +2880,154 @@ class Handler:
         addline(html.tag('h1','%s' % page_title))
         addline(html.tag('p','Default error page (page not found). To customize this, create a class in quandy_handlers.py based on this class, and define your custom handlers (including a custom error handler) there.'))
         addline(html.tag('h2','Path:'))
-        addline(handler.GetPathList(path))
+        addline(handler.get_path_list(path))
         page = html.write(
             page_title = page_title,
             body_content='\n'.join(output),
             )
         return page
+
+
+route_param_pattern = re.compile(r'^<(?:(\w+):)?(\w+)>$') # <name> or <type:name>
+route_int_pattern = re.compile(r'[0-9]+\Z') # ASCII digits only, and no trailing newline
+
+class Router:
+    """
+    Summary:
+    Maps request paths to Handler methods. Route patterns are compiled into a tree of path segments,
+    so finding the handler for a path takes as many steps as the path has segments, however many
+    routes there are. Fixed segments are tried before parameters, and if a branch doesn't lead to
+    a route the next one is tried.
+
+    Patterns look like '/users/<int:user_id>/posts/<slug>'. Parameter types:
+    str  - one segment (the default)
+    int  - one segment of digits, passed as an int
+    path - the rest of the path (one or more segments), passed joined with '/'
+    Routes that have a parameter of the same type at the same position must give it the same name.
+
+    Methods:
+    add(pattern, handler, method='default') - routes pattern to handler.method; handler can be a Handler
+        subclass (made once), a Handler instance or any function taking (path, formfields, **params)
+    route(pattern) - decorator version of add() for functions
+    match(path) - returns (function, params) for a path (a string or a list of segments), or None
+    dispatch(path, formfields) - calls function(path, formfields, **params) for the matching route
+        and returns the result, or calls the error handler (default is Handler().error) if none matches;
+        default element ids (element_ids) start from 1 for each call
+    """
+
+    def __init__(self, error=None):
+        self._root = {}
+        self._instances = {}
+        if error is None:
+            error = Handler().error
+        self.error = error
+
+    def _split(self, path):
+        if isinstance(path, (str, unicode)):
+            return [segment for segment in path.split('/') if segment != '']
+        return list(path)
+
+    def _resolve(self, handler, method):
+        if inspect.isclass(handler):
+            if handler not in self._instances:
+                self._instances[handler] = handler()
+            return getattr(self._instances[handler], method)
+        if hasattr(handler, '__call__'):
+            return handler
+        return getattr(handler, method)
+
+    def add(self, pattern, handler, method='default'):
+        """
+        Routes pattern to handler.method (or to handler itself, if it's a function)
+        """
+        function = self._resolve(handler, method)
+        node = self._root
+        segments = self._split(pattern)
+        for index, segment in enumerate(segments):
+            param = route_param_pattern.match(segment)
+            if param is None:
+                node = node.setdefault(segment, {})
+                continue
+            kind, name = param.group(1) or 'str', param.group(2)
+            if kind not in ('str', 'int', 'path'):
+                raise ValueError('unknown route parameter type: %s' % (kind, ))
+            if kind == 'path' and index != len(segments) - 1:
+                raise ValueError('a path parameter must be the last segment: %s' % (pattern, ))
+            params = node.setdefault(None, [])
+            for param_kind, param_name, child in params:
+                if param_kind != kind:
+                    continue
+                if param_name != name:
+                    # a segment here would match both, so routes must agree on the name
+                    raise ValueError('route parameter <%s:%s> conflicts with <%s:%s>: %s' % (kind, name, param_kind, param_name, pattern))
+                node = child
+                break
+            else:
+                child = {}
+                params.append((kind, name, child))
+                node = child
+        if () in node:
+            raise ValueError('route already added: %s' % (pattern, ))
+        node[()] = function # routes end at the () key, which can't be a segment
+        return function
+
+    def route(self, pattern):
+        """
+        Decorator: @router.route('/pattern') adds the function below it
+        """
+        def decorator(function):
+            self.add(pattern, function)
+            return function
+        return decorator
+
+    def _match(self, node, segments, index, params):
+        if index == len(segments):
+            if () in node:
+                return node[()]
+            return None
+        segment = segments[index]
+        child = node.get(segment)
+        if child is not None:
+            function = self._match(child, segments, index + 1, params)
+            if function is not None:
+                return function
+        for kind, name, child in node.get(None, ()):
+            if kind == 'str':
+                value = segment
+            elif kind == 'int':
+                if route_int_pattern.match(segment) is None:
+                    continue
+                value = int(segment)
+            else:
+                if () in child:
+                    params[name] = '/'.join(segments[index:])
+                    return child[()]
+                continue
+            function = self._match(child, segments, index + 1, params)
+            if function is not None:
+                params[name] = value
+                return function
+        return None
+
+    def match(self, path):
+        """
+        Returns (function, params) for the route matching path, or None
+        """
+        params = {}
+        function = self._match(self._root, self._split(path), 0, params)
+        if function is None:
+            return None
+        return (function, params)
+
+    def dispatch(self, path, formfields={}):
+        """
+        Calls the handler for path with (path, formfields, **params) and returns what it returns,
+        or returns the error handler's page if no route matches
+        """
+        segments = self._split(path)
+        params = {}
+        function = self._match(self._root, segments, 0, params)
+        with element_ids.scope(): # default element ids are numbered per request
+            if function is None:
+                return self.error(segments, formfields)
+            return function(segments, formfields, **params)
@@ -0,0 +1,328 @@
+"""
+Tests for the Cal calendar renderer. Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import datetime
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+import quandy_07
+
+
+class CalCacheTest(unittest.TestCase):
+
+    def test_list_names(self):
+        # months and weekdays can be lists, as before rendered months were cached
+        cal = quandy.Cal()
+        cal.year, cal.month = 2020, 2
+        cal.months = [''] + ['Month %d' % i for i in range(1, 13)]
+        cal.weekdays = ['Day %d' % i for i in range(7)]
+        self.assertIn('Month 2', cal.write())
+        cal.months[2] = 'Second Month'
+        self.assertIn('Second Month', cal.write())
+
+    def make_cal(self, today):
+        # _today() is read on every write, so a list lets the test move the clock
+        cal = quandy.Cal()
+        cal.year, cal.month = 2020, 2
+        cal._today = lambda: today[0]
+        return cal
+
+    def test_today_moves(self):
+        today = [datetime.date(2020, 2, 10)]
+        cal = self.make_cal(today)
+        first = cal.write()
+        self.assertIn('February 10, 2020 (Today)', first)
+        self.assertEqual(cal.write(), first)
+        today[0] = datetime.date(2020, 2, 11)
+        second = cal.write()
+        self.assertIn('February 10, 2020 (Yesterday)', second)
+        self.assertIn('February 11, 2020 (Today)', second)
+        self.assertEqual(second.count('(Today)'), 1)
+        self.assertEqual((cal.cache.hits, cal.cache.misses), (1, 2))
+
+    def test_midnight_rollover(self):
+        # a month cached late on the 31st of January is not served once it's the 1st of February
+        today = [datetime.date(2020, 1, 31)]
+        cal = self.make_cal(today)
+        self.assertIn('February 1, 2020 (Tomorrow)', cal.write())
+        today[0] = datetime.date(2020, 2, 1)
+        html = cal.write()
+        self.assertIn('February 1, 2020 (Today)', html)
+        self.assertNotIn('(Tomorrow)', html.split('February 2, 2020')[0])
+        uncached = self.make_cal(today)
+        uncached.cache = None
+        self.assertEqual(html, uncached.write())
+        self.assertEqual(''.join(cal.iter_write()), html)
+        self.assertEqual((cal.cache.hits, cal.cache.misses), (1, 2))
+
+    def test_hits_and_misses(self):
+        cal = self.make_cal([datetime.date(2020, 2, 10)])
+        html = cal.write()
+        self.assertEqual(''.join(cal.iter_write()), html)
+        self.assertEqual(cal.write(), html)
+        self.assertEqual((cal.cache.hits, cal.cache.misses), (2, 1))
+        cal.month = 3
+        cal.write()
+        cal.month = 2
+        self.assertEqual(cal.write(), html)
+        self.assertEqual((cal.cache.hits, cal.cache.misses), (3, 2))
+        self.assertEqual(len(cal.cache), 2)
+
+    def test_events_version(self):
+        cal = self.make_cal([datetime.date(2020, 2, 10)])
+        cal.write()
+        version = cal.events_version
+        cal.add_event(datetime.date(2020, 2, 14), 'added')
+        self.assertTrue(cal.events_version > version)
+        self.assertIn('added', cal.write())
+        cal.events.append((datetime.date(2020, 2, 15), 'appended directly'))
+        self.assertIn('appended directly', cal.write())
+        cal.delete_event(0)
+        self.assertNotIn('added', cal.write())
+        self.assertEqual((cal.cache.hits, cal.cache.misses), (0, 4))
+
+    def test_no_cache(self):
+        cal = self.make_cal([datetime.date(2020, 2, 10)])
+        cal.cache = None
+        html = cal.write()
+        self.assertEqual(cal.write(), html)
+        self.assertEqual(''.join(cal.iter_write()), html)
+        cal.add_event(datetime.date(2020, 2, 14), 'added')
+        self.assertIn('added', cal.write())
+        self.assertIn('added', cal.render_range((2020, 1), (2020, 3)))
+
+
+class CalEventsTest(unittest.TestCase):
+    """The date index gives the same calendars as 0.7, which scanned every event for every day."""
+
+    def setUp(self):
+        rnd = random.Random(1)
+        self.events = [(datetime.date(2020, rnd.randint(1, 4), rnd.randint(1, 28)), 'event %d' % i) for i in range(500)]
+        self.cal, self.cal_07 = quandy.Cal(), quandy_07.Cal()
+        for cal in (self.cal, self.cal_07):
+            for eventdate, details in self.events:
+                cal.add_event(eventdate, details)
+
+    def assertSameCalendars(self):
+        for month in range(1, 6):
+            for weekday_start in (0, 6):
+                for cal in (self.cal, self.cal_07):
+                    cal.year, cal.month, cal.weekday_start = 2020, month, weekday_start
+                self.assertEqual(self.cal.write(), self.cal_07.write())
+
+    def test_write(self):
+        self.assertSameCalendars()
+
+    def test_delete_event(self):
+        for index in (0, 250, -1, 17, 17):
+            self.cal.delete_event(index)
+            self.cal_07.delete_event(index)
+        self.assertSameCalendars()
+
+    def test_events_changed_directly(self):
+        self.assertSameCalendars() # build the index first
+        for cal in (self.cal, self.cal_07):
+            cal.events[3] = (datetime.date(2020, 2, 29), 'moved')
+            cal.events.append((datetime.date(2020, 5, 1), 'appended'))
+        self.assertSameCalendars()
+        for cal in (self.cal, self.cal_07):
+            cal.events = [(datetime.date(2020, 3, 3), 'replaced')]
+        self.assertSameCalendars()
+
+    def test_add_events_and_get_events(self):
+        cal = quandy.Cal()
+        cal.add_events(self.events)
+        self.assertEqual(list(cal.events), list(self.cal.events))
+        start, end = datetime.date(2020, 2, 10), datetime.date(2020, 3, 5)
+        self.assertEqual(sorted(cal.get_events(start, end)),
+                         sorted(event for event in self.events if start <= event[0] <= end))
+
+
+class CalRangeTest(unittest.TestCase):
+    """render_range(), render_year() and iter_write() give the same months as 0.7's write(), one month at a time."""
+
+    def setUp(self):
+        rnd = random.Random(3)
+        start = datetime.date(2019, 11, 1)
+        self.events = [(start + datetime.timedelta(days=rnd.randint(0, 480)), 'event %d' % i) for i in range(600)]
+        self.cal, self.cal_07 = quandy.Cal(), quandy_07.Cal()
+        for cal in (self.cal, self.cal_07):
+            cal.weekday_start = 0
+            for eventdate, details in self.events:
+                cal.add_event(eventdate, details)
+
+    def write_07(self, start, end):
+        output = []
+        year, month = start
+        while (year, month) <= end:
+            self.cal_07.year, self.cal_07.month = year, month
+            output.append(self.cal_07.write())
+            year, month = self.cal.get_next_month(year, month)
+        return '\n'.join(output)
+
+    def test_range(self):
+        for start, end in (((2020, 3), (2020, 3)), ((2020, 1), (2020, 6)), ((2019, 11), (2021, 2))):
+            self.assertEqual(self.cal.render_range(start, end), self.write_07(start, end), (start, end))
+        self.assertEqual(self.cal.render_range(datetime.date(2019, 12, 25), datetime.date(2020, 1, 2)),
+                         self.write_07((2019, 12), (2020, 1)))
+
+    def test_partly_cached(self):
+        # months already in the cache from write() are reused, the rest are rendered and cached
+        for month in (12, 2):
+            self.cal.year, self.cal.month = 2020 if month == 2 else 2019, month
+            self.cal.write()
+        misses = self.cal.cache.misses
+        self.assertEqual(self.cal.render_range((2019, 11), (2020, 3)), self.write_07((2019, 11), (2020, 3)))
+        self.assertEqual((self.cal.cache.hits, self.cal.cache.misses), (2, misses + 3))
+        self.assertEqual(self.cal.render_range((2019, 11), (2020, 3)), self.write_07((2019, 11), (2020, 3)))
+        self.assertEqual(self.cal.cache.hits, 7)
+
+    def test_year(self):
+        self.assertEqual(self.cal.render_year(2020), self.write_07((2020, 1), (2020, 12)))
+        self.cal.year = 2019
+        self.assertEqual(self.cal.render_year(), self.write_07((2019, 1), (2019, 12)))
+
+    def test_iter_write(self):
+        for month in (12, 1, 2):
+            year = 2019 if month == 12 else 2020
+            self.cal.year, self.cal.month = self.cal_07.year, self.cal_07.month = year, month
+            misses, hits = self.cal.cache.misses, self.cal.cache.hits
+            chunks = list(self.cal.iter_write())
+            self.assertTrue(len(chunks) > 2) # head and weeks, not one string
+            self.assertEqual(''.join(chunks), self.cal_07.write())
+            self.assertEqual(self.cal.cache.misses, misses + 1)
+            self.assertEqual(''.join(self.cal.iter_write()), self.cal_07.write())
+            self.assertEqual(self.cal.cache.hits, hits + 1)
+
+    def test_iter_write_stopped_early(self):
+        # a response that is abandoned part way through doesn't leave half a month in the cache
+        self.cal.year, self.cal.month = self.cal_07.year, self.cal_07.month = 2020, 4
+        chunks = self.cal.iter_write()
+        next(chunks)
+        chunks.close()
+        self.assertEqual(len(self.cal.cache), 0)
+        self.assertEqual(''.join(self.cal.iter_write()), self.cal_07.write())
+
+
+
+class EventStoreTest(unittest.TestCase):
+
+    def test_assignment_updates_index(self):
+        day = datetime.date(2020, 2, 1)
+        events = [(day + datetime.timedelta(days=i % 20), 'event %d' % i) for i in range(50)]
+        store = quandy.EventStore(events)
+        store.between(day, day) # build the index
+        store[3] = events[3] = (datetime.date(2020, 3, 1), 'moved')
+        store[-1] = events[-1] = (day, 'last')
+        store[10:12] = events[10:12] = [(day, 'a'), (day, 'b'), (day, 'c')]
+        self.assertEqual(list(store), events)
+        self.assertEqual(store.between(day, datetime.date(2020, 3, 1)), sorted(events, key=lambda event: event[0]))
+        self.assertRaises(TypeError, store.__setitem__, 0, ('2020-02-01', 'not a date'))
+
+    def test_list_methods(self):
+        # every list method gives the same events as a plain list, and keeps the date index right
+        day = datetime.date(2020, 2, 1)
+        events = [(day + datetime.timedelta(days=i % 20), 'event %d' % i) for i in range(50)]
+        store = quandy.EventStore(events)
+        last_day = day + datetime.timedelta(days=19)
+        changes = [
+            ('insert', (0, (last_day, 'first'))),
+            ('insert', (-3, (day, 'near the end'))),
+            ('insert', (100, (day, 'past the end'))),
+            ('remove', (events[5], )),
+            ('reverse', ()),
+            ('sort', ()),
+            ('sort', ()),
+            ('append', ((day, 'appended'), )),
+            ('pop', (0, )),
+            ('sort', ()),
+            ('__iadd__', ([(last_day, 'added')], )),
+        ]
+        for method, args in changes:
+            store.between(day, day) # build the index, so each change has to drop it
+            version = store.version
+            getattr(store, method)(*args)
+            events = list(events)
+            getattr(events, method)(*args)
+            self.assertTrue(store.version > version, method)
+            self.assertEqual(list(store), events, method)
+            self.assertEqual(store.between(day, last_day), sorted(events, key=lambda event: event[0]), method)
+        self.assertEqual(store.index(events[7]), events.index(events[7]))
+        self.assertEqual(store.count((day, 'appended')), 1)
+        self.assertTrue((day, 'appended') in store)
+        self.assertRaises(ValueError, store.remove, (day, 'not there'))
+        store.sort(key=lambda event: event[1], reverse=True)
+        events.sort(key=lambda event: event[1], reverse=True)
+        self.assertEqual(list(store), events)
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.between(day, last_day), [])
+
+    def test_equality(self):
+        day = datetime.date(2020, 2, 1)
+        events = [(day, 'a'), (day, 'b')]
+        store = quandy.EventStore(events)
+        self.assertTrue(store == events)
+        self.assertTrue(store == tuple(events))
+        self.assertTrue(store == quandy.EventStore(events))
+        self.assertFalse(store != events)
+        self.assertTrue(store != events[::-1])
+        self.assertTrue(store != quandy.EventStore(events[:1]))
+        self.assertFalse(store == 'ab')
+        self.assertRaises(TypeError, hash, store)
+
+
+class CalProviderTest(unittest.TestCase):
+    """Provided events show up in write() and get_events() as if they had been added after the stored ones."""
+
+    def setUp(self):
+        rnd = random.Random(2)
+        self.stored = [(datetime.date(2020, rnd.randint(1, 4), rnd.randint(1, 28)), 'stored %d' % i) for i in range(100)]
+        self.provided = [(datetime.date(2020, rnd.randint(1, 4), rnd.randint(1, 28)), 'provided %d' % i) for i in range(100)]
+        self.calls = []
+        self.cal = quandy.Cal()
+        self.cal.add_events(self.stored)
+        self.cal.provider = self.provide
+
+    def provide(self, start, end):
+        self.calls.append((start, end))
+        return [event for event in self.provided if start <= event[0] <= end]
+
+    def test_write(self):
+        cal_07 = quandy_07.Cal()
+        for eventdate, details in self.stored + self.provided:
+            cal_07.add_event(eventdate, details)
+        for month in (1, 2, 3, 4):
+            self.cal.year, self.cal.month = cal_07.year, cal_07.month = 2020, month
+            self.assertEqual(self.cal.write(), cal_07.write())
+        # only the dates on display are asked for - April 2020 shows whole weeks, Sunday 29 March to Saturday 2 May
+        self.assertEqual(self.calls[-1], (datetime.date(2020, 3, 29), datetime.date(2020, 5, 2)))
+
+    def test_get_events(self):
+        start, end = datetime.date(2020, 2, 1), datetime.date(2020, 3, 15)
+        expected = [event for event in self.stored + self.provided if start <= event[0] <= end]
+        expected.sort(key=lambda event: event[0])
+        self.assertEqual(self.cal.get_events(start, end), expected)
+        self.assertEqual(self.calls, [(start, end)])
+
+    def test_not_cached(self):
+        # the provider's data can change at any time, so months are rendered fresh every time
+        self.cal.year, self.cal.month = 2020, 2
+        first = self.cal.write()
+        self.provided.append((datetime.date(2020, 2, 14), 'late addition'))
+        second = self.cal.write()
+        self.assertNotIn('late addition', first)
+        self.assertIn('late addition', second)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual((self.cal.cache.hits, self.cal.cache.misses), (0, 0))
+        self.assertEqual(len(self.cal.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Tests for the batch date methods. Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import datetime
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def make_column(count, seed=18):
+    """Random date strings: padded and unpadded, both delimiters, a few malformed, many repeats."""
+    rnd = random.Random(seed)
+    column = []
+    for i in range(count):
+        yr, mt, dy = rnd.randint(1, 2100), rnd.randint(1, 12), rnd.randint(1, 28)
+        shape = rnd.randint(0, 5)
+        if shape == 0:
+            column.append('%d-%d-%d' % (yr, mt, dy))
+        elif shape == 1:
+            column.append('%04d/%02d' % (yr, mt))
+        elif shape == 2:
+            column.append('%04d/%02d-%02d' % (yr, mt, dy))
+        else:
+            column.append('%04d%s%02d%s%02d' % ((yr, '/', mt, '/', dy) if shape == 3 else (yr, '-', mt, '-', dy)))
+    return column + column[:count // 2]
+
+
+class StringsToDatesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+        self.column = make_column(2000)
+
+    def test_list_matches_string_to_date(self):
+        self.assertEqual(self.tools.strings_to_dates(self.column),
+                         [self.tools.string_to_date(s) for s in self.column])
+
+    @unittest.skipIf(numpy is None, 'needs NumPy')
+    def test_datetime64_matches_string_to_date(self):
+        converted = self.tools.strings_to_dates(self.column, as_datetime64=True)
+        self.assertEqual(converted.dtype, numpy.dtype('datetime64[D]'))
+        expected = [self.tools.string_to_date(s) for s in self.column]
+        self.assertEqual(len(converted), len(expected))
+        for value, date in zip(converted.tolist(), expected):
+            self.assertEqual(value, None if date is False else date)
+
+    @unittest.skipIf(numpy is None, 'needs NumPy')
+    def test_datetime64_edge_cases(self):
+        converted = self.tools.strings_to_dates(['2009/06/30', '2009-06-30', '2009-6-3', '2009-06', '2009/06-30'],
+                                                as_datetime64=True).tolist()
+        self.assertEqual(converted, [datetime.date(2009, 6, 30), datetime.date(2009, 6, 30),
+                                     datetime.date(2009, 6, 3), None, None])
+        self.assertEqual(len(self.tools.strings_to_dates([], as_datetime64=True)), 0)
+
+    @unittest.skipIf(numpy is None, 'needs NumPy')
+    def test_datetime64_raises_like_string_to_date(self):
+        for strdate in ('2009-13-01', '2009/02/30', '0000-01-01'):
+            self.assertRaises(ValueError, self.tools.string_to_date, strdate)
+            self.assertRaises(ValueError, self.tools.strings_to_dates, [strdate], as_datetime64=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
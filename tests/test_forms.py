@@ -0,0 +1,116 @@
+"""
+Tests for forms, checked against Quandy 0.7 (tests/quandy_07.py) on seeded random fields and values.
+Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+import quandy_07
+
+
+def make_fields(count, seed=24):
+    """Formfield.write() keyword dicts covering every widget, with explicit ids (0.7 makes random ones)."""
+    rnd = random.Random(seed)
+    fields = []
+    for i in range(count):
+        widget = rnd.choice(['input', 'input', 'hidden', 'textarea', 'separator', 'select', 'radio', 'checkbox'])
+        spec = {'id': 'field_%d' % i, 'title': rnd.choice(['', 'Field %d' % i, '<b>Bold</b> title'])}
+        if rnd.random() < 0.3:
+            spec['classname'] = 'class_%d' % i
+        if widget == 'hidden':
+            spec['type'] = 'hidden'
+            spec['visible'] = rnd.random() < 0.5
+        elif widget == 'input':
+            spec['type'] = rnd.choice(['text', 'password', 'submit'])
+        else:
+            spec['widget'] = widget
+        if widget == 'textarea':
+            spec['twolines'] = rnd.random() < 0.5
+        if widget in ('select', 'radio', 'checkbox'):
+            spec['options'] = [rnd.choice(['option %d' % n, ['v%d' % n, 'Option %d' % n]]) for n in range(rnd.randint(0, 6))]
+            if widget == 'select':
+                spec['leadingoption'] = rnd.choice(['', '-- choose --'])
+                spec['multiple'] = rnd.choice(['', 'y'])
+        if rnd.random() < 0.2:
+            spec['retainstate'] = 'false'
+        fields.append(spec)
+    return fields
+
+
+def make_values(fields, rnd):
+    values = {}
+    for spec in fields:
+        choice = rnd.random()
+        if choice < 0.2:
+            continue # left to the spec's value
+        options = spec.get('options')
+        if options and choice < 0.7:
+            option = rnd.choice(options)
+            values[spec['id']] = option[0] if isinstance(option, list) else option
+        elif spec.get('type') != 'hidden' and choice < 0.8:
+            values[spec['id']] = rnd.randint(0, 99)
+        else:
+            values[spec['id']] = rnd.choice(['', 'plain', 'with "quotes" & <tags>', 'v1'])
+    return values
+
+
+class FormSchemaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fields = make_fields(200)
+        self.form = {'id': 'big_form', 'title': 'Big Form', 'action': '/save'}
+
+    def write_07(self, values, table):
+        formfield = quandy_07.Formfield()
+        fields = [formfield.write(**dict(spec, value=values.get(spec['id'], spec.get('value', '')))) for spec in self.fields]
+        return quandy_07.Form().write(fields, table=table, **self.form)
+
+    def test_same_as_07(self):
+        rnd = random.Random(24)
+        schemas = [(quandy.FormSchema(self.fields, self.form, quandy.table_layout), True),
+                   (quandy.FormSchema(self.fields, self.form, quandy.container_layout), False)]
+        for n in range(50):
+            values = make_values(self.fields, rnd)
+            for schema, table in schemas:
+                self.assertEqual(schema.render(values), self.write_07(values, table))
+        for schema, table in schemas:
+            self.assertEqual(schema.render(), self.write_07({}, table))
+
+    def test_errors(self):
+        schema = quandy.FormSchema([{'id': 'email'}, {'id': 'name'}], self.form)
+        html = schema.render({'email': 'x'}, {'email': 'Please enter a valid email address'})
+        row = ('\n  <tr id="email_error" class="_error form_error">\n    <td colspan="2" class="form_error">'
+               'Please enter a valid email address</td>\n  </tr>')
+        self.assertIn('type="text">\n    </td>\n  </tr>%s\n  <tr id="name_item"' % row, html)
+        self.assertEqual(html.replace(row, ''), schema.render({'email': 'x'}))
+
+    def test_generated_ids_are_stable(self):
+        schema = quandy.FormSchema([{'title': 'No id'}], self.form)
+        self.assertEqual(schema.render(), schema.render())
+        self.assertTrue(schema.fields[0]['id'])
+
+
+    def test_generated_ids_unique_on_dispatched_page(self):
+        # a schema built up front, rendered into a page next to widgets that take default ids
+        schema = quandy.FormSchema([{'title': 'First'}, {'title': 'Second'}], {'title': 'Schema form'})
+
+        def page(path, formfields):
+            return '\n'.join([schema.render(), quandy.Formfield().write(title='Other'), quandy.Form().write([], title='Other form')])
+
+        router = quandy.Router()
+        router.add('/page', page)
+        for n in range(2):
+            ids = re.findall(r'<(?:input|form) id="([^"]*)"', router.dispatch('/page'))
+            self.assertEqual(len(ids), 5)
+            self.assertEqual(len(set(ids)), 5, ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
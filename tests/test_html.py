@@ -0,0 +1,149 @@
+"""
+Tests for Html page writing and the table renderers. Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import itertools
+import os
+import sqlite3
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+import quandy_07
+
+
+class IterTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.html = quandy.Html()
+        self.db = sqlite3.connect(':memory:')
+        self.db.execute('create table people (id integer, name text, score real)')
+        self.db.executemany('insert into people values (?, ?, ?)', [(i, 'person %d' % i, i / 4.0) for i in range(1, 101)])
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_sqlite_cursor(self):
+        cursor = self.db.execute('select id, name, score from people order by id')
+        chunks = list(self.html.iter_table(cursor, id='people', formatters={'score': lambda v: '%.1f' % v}))
+        self.assertEqual(len(chunks), 102) # head, one chunk per row, foot
+        self.assertEqual(chunks[0], '<table id="people">\n  <thead>\n  <tr>\n    <th>id</th>\n    <th>name</th>\n    <th>score</th>\n  </tr>\n  </thead>\n  <tbody>\n')
+        self.assertEqual(chunks[1], '  <tr>\n    <td>1</td>\n    <td>person 1</td>\n    <td>0.2</td>\n  </tr>\n')
+        self.assertEqual(chunks[-1], '  </tbody>\n</table>')
+
+    def test_sqlite_paging(self):
+        cursor = self.db.execute('select id, name from people order by id')
+        chunks = list(self.html.iter_table(cursor, id='people', page_size=30, page=4))
+        self.assertEqual(len(chunks), 12)
+        self.assertTrue(chunks[1].startswith('  <tr>\n    <td>91</td>'))
+        self.assertTrue(chunks[-2].startswith('  <tr>\n    <td>100</td>'))
+
+    def test_sqlite_streams(self):
+        # rows are only fetched as the chunks are asked for
+        cursor = self.db.execute('select id from people order by id')
+        table = self.html.iter_table(cursor, id='people')
+        next(table)
+        next(table)
+        self.assertEqual(cursor.fetchone(), (2, ))
+
+    def test_list_formatters_without_columns(self):
+        chunks = list(self.html.iter_table(iter([(1, 'a'), (2, 'b')]), formatters=[lambda v: v * 10, None], id='t'))
+        self.assertEqual(chunks[0], '<table id="t">\n  <tbody>\n')
+        self.assertEqual(chunks[1], '  <tr>\n    <td>10</td>\n    <td>a</td>\n  </tr>\n')
+
+    def test_dict_rows_without_columns(self):
+        rows = iter([{'a': 1, 'b': 2}, {'b': 4}])
+        chunks = list(self.html.iter_table(rows, id='t', formatters={'b': lambda v: '<b>%s</b>' % v}))
+        self.assertIn('<th>a</th>', chunks[0])
+        self.assertEqual(chunks[2], '  <tr>\n    <td></td>\n    <td><b>4</b></td>\n  </tr>\n')
+
+    def test_mapping_rows(self):
+        # rows that are mappings but not dicts, like SQLAlchemy's result.mappings()
+        class Result(object):
+            def __init__(self, rows):
+                self.rows = rows
+
+            def keys(self):
+                return ['id', 'name']
+
+            def __iter__(self):
+                return iter(self.rows)
+
+        rows = [types.MappingProxyType({'id': 1, 'name': 'one'}), types.MappingProxyType({'name': 'two', 'id': 2})]
+        expected = ['  <tr>\n    <td>1</td>\n    <td>one</td>\n  </tr>\n', '  <tr>\n    <td>2</td>\n    <td>two</td>\n  </tr>\n']
+        chunks = list(self.html.iter_table(Result(rows), id='t'))
+        self.assertIn('<th>name</th>', chunks[0])
+        self.assertEqual(chunks[1:3], expected)
+        chunks = list(self.html.iter_table(iter(rows), id='t')) # columns from the first row
+        self.assertIn('<th>name</th>', chunks[0])
+        self.assertEqual(chunks[1:3], expected)
+
+    def test_dict_formatters_need_columns(self):
+        table = self.html.iter_table(iter([(1, 2)]), formatters={'a': str})
+        self.assertRaises(ValueError, next, table)
+
+    def test_no_rows(self):
+        self.assertEqual(''.join(self.html.iter_table(iter([]), id='t')), '<table id="t">\n  <tbody>\n  </tbody>\n</table>')
+
+
+class PageLayoutTest(unittest.TestCase):
+    """Html.write() and PageLayout.write() give the same pages as 0.7's Html.write()."""
+
+    def write_07(self, **kwargs):
+        # 0.7 names its own version in the generator meta tag
+        page = quandy_07.Html().write(**kwargs)
+        return page.replace('Quandy %s;' % quandy_07.__version__, 'Quandy %s;' % quandy.__version__)
+
+    def test_same_pages(self):
+        doctypes = ['html 4 strict', 'html5', 'html 4 transitional', 'html 4 quirks', 'xhtml 1 strict', 'xhtml 1 transitional', 'other']
+        file_lists = [[], ['a.css'], ['a.css', 'b.css', 'c.css']]
+        html = quandy.Html()
+        for doctype, nocache, rss, css_files, js_extend in itertools.product(doctypes, (False, True), ('', '/rss'), file_lists, file_lists):
+            kwargs = dict(doctype=doctype, nocache=nocache, rss=rss, css_files=css_files, css_extend=['x.css'],
+                          js_files=['a.js', 'b.js'], js_extend=js_extend, lang='fr', charset='latin-1', site_name='Site <&>')
+            expected = self.write_07(page_title='Page', body_content='<p>body</p>', **kwargs)
+            self.assertEqual(html.write(page_title='Page', body_content='<p>body</p>', **kwargs), expected)
+            self.assertEqual(quandy.PageLayout(**kwargs).write('Page', '<p>body</p>'), expected)
+
+    def test_cached_layout_follows_changed_lists(self):
+        html = quandy.Html()
+        css_files = ['a.css']
+        for body in ('one', 'two'):
+            self.assertEqual(html.write(body_content=body, css_files=css_files), self.write_07(body_content=body, css_files=css_files))
+        css_files.append('b.css')
+        self.assertEqual(html.write(body_content='three', css_files=css_files), self.write_07(body_content='three', css_files=css_files))
+
+    def test_generator_lists(self):
+        html = quandy.Html()
+        for n in range(2): # a new layout, then the cached one
+            page = html.write(css_files=(f for f in ['a.css']), css_extend=(f for f in ['b.css']),
+                              js_files=(f for f in ['a.js']), js_extend=(f for f in ['b.js']))
+            self.assertEqual(page, self.write_07(css_files=['a.css'], css_extend=['b.css'], js_files=['a.js'], js_extend=['b.js']))
+            self.assertIn('a.css', page)
+
+    def test_iter_write(self):
+        # a generator body mixing str, bytes already in the charset and empty chunks
+        pieces = ['<p>caf\xe9</p>', b'<p>bytes</p>', '', b'', '<p>\u20ac 5</p>', '\n']
+        for charset in ('UTF-8', 'latin-1'):
+            layout = quandy.PageLayout(charset=charset, css_files=['a.css'], js_files=['a.js'])
+            text = ''.join(piece.decode(charset) if isinstance(piece, bytes) else piece for piece in pieces)
+            expected = layout.write('Page', text).encode(charset, 'xmlcharrefreplace')
+            chunks = list(layout.iter_write('Page', (piece for piece in pieces)))
+            self.assertTrue(all(isinstance(chunk, bytes) and chunk for chunk in chunks))
+            self.assertEqual(b''.join(chunks), expected)
+            self.assertEqual(b''.join(layout.iter_write('Page', text)), expected)
+            self.assertEqual(b''.join(quandy.Html().iter_write(body_content=(piece for piece in pieces), page_title='Page',
+                                                              charset=charset, css_files=['a.css'], js_files=['a.js'])), expected)
+
+    def test_iter_write_title_references(self):
+        layout = quandy.PageLayout(charset='ascii')
+        page = b''.join(layout.iter_write('Caf\xe9 \u2603', 'body'))
+        self.assertIn(b'<title>Caf&#233; &#9731;', page)
+        self.assertEqual(page, layout.write('Caf\xe9 \u2603', 'body').encode('ascii', 'xmlcharrefreplace'))
+
+
+if __name__ == '__main__':
+    unittest.main()
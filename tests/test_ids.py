@@ -0,0 +1,62 @@
+"""
+Tests for IdAllocator and the default element ids. Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+
+
+class IdAllocatorTest(unittest.TestCase):
+
+    def test_counts(self):
+        ids = quandy.IdAllocator('f', 5)
+        self.assertEqual([ids.next_id(), ids(), ids.next_id('g')], ['f5', 'f6', 'g7'])
+        ids.reset()
+        self.assertEqual(ids.next_id(), 'f1')
+
+    def test_scope(self):
+        ids = quandy.IdAllocator()
+        ids.next_id()
+        ids.next_id()
+        with ids.scope():
+            self.assertEqual(ids.next_id(), 'id_1')
+            with ids.scope(10):
+                self.assertEqual(ids.next_id(), 'id_10')
+            self.assertEqual(ids.next_id(), 'id_2')
+        self.assertEqual(ids.next_id(), 'id_3')
+
+    def test_threads_count_separately(self):
+        ids = quandy.IdAllocator()
+        results = {}
+        ready = threading.Barrier(4) if hasattr(threading, 'Barrier') else None
+
+        def render(name):
+            with ids.scope():
+                if ready is not None:
+                    ready.wait()
+                results[name] = [ids.next_id() for i in range(100)]
+
+        threads = [threading.Thread(target=render, args=(n, )) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = ['id_%d' % i for i in range(1, 101)]
+        for name in range(4):
+            self.assertEqual(results[name], expected)
+
+    def test_dispatch_ids_repeat(self):
+        router = quandy.Router()
+        router.add('/form', lambda path, formfields: quandy.Form().write([quandy.Formfield().write()]))
+        first = router.dispatch('/form')
+        self.assertEqual(router.dispatch('/form'), first)
+        self.assertIn('id="id_2"', first)
+
+
+if __name__ == '__main__':
+    unittest.main()
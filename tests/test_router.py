@@ -0,0 +1,112 @@
+"""
+Tests for Router. Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+
+
+def show(path, formfields, **params):
+    return params
+
+
+class RouterTest(unittest.TestCase):
+
+    def test_parameter_types(self):
+        router = quandy.Router()
+        router.add('/users/<int:uid>/files/<path:rest>', show)
+        router.add('/users/<int:uid>', show)
+        router.add('/pages/<slug>', show)
+        self.assertEqual(router.match('/users/42')[1], {'uid': 42})
+        self.assertEqual(router.match('/users/42/files/a/b/c.txt')[1], {'uid': 42, 'rest': 'a/b/c.txt'})
+        self.assertEqual(router.match(['pages', 'about'])[1], {'slug': 'about'})
+        self.assertIsNone(router.match('/users/x'))
+        self.assertIsNone(router.match('/users/42/files'))
+
+    def test_int_is_ascii_digits_only(self):
+        router = quandy.Router()
+        router.add('/users/<int:uid>', show)
+        for segment in ('\u0661\u0662', '\uff11', '12\n', '-1', '+1', ' 1', '1.0'):
+            self.assertIsNone(router.match(['users', segment]), repr(segment))
+        router.add('/users/<name>', show)
+        self.assertEqual(router.match(['users', '12\n'])[1], {'name': '12\n'})
+
+    def test_fixed_segments_first_and_backtracking(self):
+        router = quandy.Router()
+        router.add('/users/<int:uid>/edit', lambda path, formfields, uid: 'edit %d' % uid)
+        router.add('/users/new', lambda path, formfields: 'new')
+        router.add('/users/<name>/posts', lambda path, formfields, name: 'posts by %s' % name)
+        self.assertEqual(router.dispatch('/users/new'), 'new')
+        self.assertEqual(router.dispatch('/users/7/edit'), 'edit 7')
+        self.assertEqual(router.dispatch('/users/7/posts'), 'posts by 7') # the int branch has no posts
+        self.assertIn('<li>nowhere</li>', router.dispatch('/nowhere'))
+
+    def test_bad_routes(self):
+        router = quandy.Router()
+        router.add('/users/<int:uid>', show)
+        router.add('/users/<int:uid>/posts', show) # the same parameter is shared
+        self.assertRaises(ValueError, router.add, '/users/<int:uid>', show)
+        self.assertRaises(ValueError, router.add, '/users/<int:other>', show)
+        self.assertRaises(ValueError, router.add, '/users/<int:other>/files', show)
+        self.assertRaises(ValueError, router.add, '/users/<float:uid>', show)
+        self.assertRaises(ValueError, router.add, '/files/<path:rest>/edit', show)
+        router.add('/users/<name>/files', show) # a different type at the same position is fine
+        self.assertEqual(router.match('/users/bob/files')[1], {'name': 'bob'})
+
+    def test_handlers(self):
+        made = []
+
+        class Page(quandy.Handler):
+            def __init__(self):
+                made.append(self)
+
+            def default(self, path, formfields, slug=''):
+                return 'page %s' % slug
+
+            def edit(self, path, formfields, slug=''):
+                return 'edit %s' % slug
+
+        router = quandy.Router()
+        router.add('/pages/<slug>', Page)
+        router.add('/pages/<slug>/edit', Page, 'edit')
+        self.assertEqual(router.dispatch('/pages/about'), 'page about')
+        self.assertEqual(router.dispatch('/pages/about/edit'), 'edit about')
+        self.assertEqual(len(made), 1)
+
+    def test_same_as_linear_scan(self):
+        # unambiguous routes, so the trie and a scan of one regex per route must agree on every path
+        rnd = random.Random(25)
+        words = ['alpha', 'beta', 'gamma', 'delta', 'omega']
+        router, regexes, routes = quandy.Router(), [], []
+        for n in range(1000):
+            route = (rnd.choice(words), '%s%d' % (rnd.choice(words), n), rnd.choice(words))
+            pattern = '/%s/%s/<int:id>/%s' % route
+            router.add(pattern, show)
+            routes.append(route)
+            regexes.append((re.compile('^%s$' % re.escape(pattern).replace(re.escape('<int:id>'), '([0-9]+)')), pattern))
+        matched = 0
+        for n in range(3000):
+            first, second, last = rnd.choice(routes)
+            if rnd.random() < 0.3:
+                first, last = rnd.choice(words), rnd.choice(words)
+            path = '/%s/%s/%s/%s' % (first, second, rnd.choice(['12', 'x', '007', '']), last)
+            expected = None
+            for regex, pattern in regexes:
+                found = regex.match(path)
+                if found:
+                    expected = {'id': int(found.group(1))}
+                    break
+            found = router.match(path)
+            self.assertEqual(found and found[1], expected, path)
+            matched += expected is not None
+        self.assertTrue(1000 < matched < 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,296 @@
+"""
+Tests for the Tools text cleaners and TextPipeline, mostly checked against Quandy 0.7 (tests/quandy_07.py)
+on seeded random input. Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import io
+import os
+import random
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+import quandy_07
+
+
+def make_records(count, seed=11):
+    """Short HTML records mixing tags, cp1252 gremlins, links, addresses and names."""
+    rnd = random.Random(seed)
+    pieces = ['<p>', '</p>', '<b>', '</b>', '<a href="/x">', '</a>', '<br />', '< ', ' > ', '<>',
+              'http://example.com/page?id=1', 'https://www.example.org/a_b', 'see www.example.net.',
+              'bob@example.com', 'ryan@quandyfactory.com', 'a@b', '@',
+              "o'neil", 'mcdonald', 'MACDONALD', 'van-dyke', '"quoted"', "cat's hat",
+              '\x91smart\x92', '\x93quotes\x94', '\x85', '\x81', '€', '\xe9t\xe9',
+              ' ', ' ', '\n', '-', 'word', 'Title', 'x']
+    return [''.join(rnd.choice(pieces) for i in range(rnd.randint(0, 12))) for n in range(count)]
+
+
+class TextPipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+        self.records = make_records(2000)
+
+    def one_by_one(self, text, names=False):
+        text = self.tools.strip_html(text)
+        text = self.tools.fix_1252_codes(text)
+        text = self.tools.mark_it_up(text)
+        return self.tools.pcase(text, names)
+
+    def test_same_as_tools_methods(self):
+        for names in (False, True):
+            pipeline = quandy.TextPipeline(['strip_html', 'fix_1252_codes', 'mark_it_up', 'pcase'], names)
+            expected = [self.one_by_one(text, names) for text in self.records]
+            self.assertEqual([pipeline.process(text) for text in self.records], expected)
+            self.assertEqual(list(pipeline.process_many(self.records)), expected)
+
+    def test_same_as_07(self):
+        # 0.7's fix_1252_codes() and email linking were broken on Python 3, so compare the other steps
+        tools_07 = quandy_07.Tools()
+        pipeline = quandy.TextPipeline(['strip_html', 'pcase'])
+        self.assertEqual([pipeline.process(text) for text in self.records],
+                         [tools_07.pcase(tools_07.strip_html(text)) for text in self.records])
+
+    def test_workers(self):
+        pipeline = quandy.TextPipeline(['strip_html', 'fix_1252_codes', 'mark_it_up'])
+        records = self.records[:200]
+        self.assertEqual(list(pipeline.process_many(records, workers=2, batch_size=7)),
+                         [pipeline.process(text) for text in records])
+
+    def test_function_steps(self):
+        pipeline = quandy.TextPipeline(['strip_html', str.upper])
+        self.assertEqual(pipeline.process('<b>bold</b> text'), 'BOLD TEXT')
+        self.assertRaises(ValueError, quandy.TextPipeline, ['no_such_step'])
+
+
+def fix_1252_reference(text):
+    """What 0.7's fix_1252_codes() does on Python 2; on Python 3 it raises TypeError when there are gremlins."""
+    if isinstance(text, bytes):
+        if re.search(b'[\x80-\x9f]', text) is None:
+            return text
+        text = text.decode('iso-8859-1')
+    return re.sub(u'[\x80-\x9f]', lambda match: quandy_07.cp_1252_chars.get(match.group(), match.group()), text)
+
+
+def make_documents(count, seed=13):
+    """Random text made of '<', '>', letters and whitespace, so tags open and close anywhere."""
+    rnd = random.Random(seed)
+    return [''.join(rnd.choice('<<>>ab \n') for i in range(rnd.randint(0, 60))) for n in range(count)]
+
+
+def make_posts(count, seed=12, whitespace=True):
+    """Forum-style text of URLs, addresses and words; the URLs never contain '@'."""
+    rnd = random.Random(seed)
+    tokens = ['http://example.com/a?b=1&c=2', 'https://www.example.org/x_y/(z)', 'ftp://files.example.net/f.zip',
+              'www.example.com', 'bob@example.com', 'a.b-c@d-e.example.co.uk', 'x@y', '@', 'me@host.',
+              'word', 'words,', '(see', 'it).', 'http:', 'https://', '--', 'été']
+    separators = [' ', ' ', '\n', '\t', '  '] if whitespace else ['', ',', ';']
+    return [''.join(rnd.choice(tokens) + rnd.choice(separators) for i in range(rnd.randint(0, 30))) for n in range(count)]
+
+
+def mark_it_up_two_pass(plaintext):
+    """0.7's mark_it_up() with its email pattern fixed: '.w+' was meant to be '\\.\\w+'."""
+    output = re.sub(r'((https?|ftp|gopher|telnet|file|notes|ms-help):((//)|(\\\\))+[\w\d:#@%/;$()~_?\+-=\\\.&]*)',
+                    lambda match: '<a href="%s">%s</a>' % (match.group(1), match.group(1)), plaintext)
+    return re.sub(r'([a-zA-Z_0-9.-]+@[a-zA-Z_0-9.-]+\.\w+)',
+                  lambda match: '<a href="mailto:%s">%s</a>' % (match.group(1), match.group(1)), output)
+
+
+class MarkItUpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+
+    def test_urls_same_as_07(self):
+        tools_07 = quandy_07.Tools()
+        for text in make_posts(2000) + make_posts(500, whitespace=False):
+            text = text.replace('@', '')
+            self.assertEqual(self.tools.mark_it_up(text), tools_07.mark_it_up(text))
+
+    def test_same_as_two_passes(self):
+        for text in make_posts(2000):
+            self.assertEqual(self.tools.mark_it_up(text), mark_it_up_two_pass(text))
+
+    def test_addresses_07_missed(self):
+        self.assertEqual(self.tools.mark_it_up('mail ryan@quandyfactory.com now'),
+                         'mail <a href="mailto:ryan@quandyfactory.com">ryan@quandyfactory.com</a> now')
+
+    def test_iter_mark_it_up(self):
+        for text in make_posts(300) + make_posts(100, whitespace=False):
+            expected = self.tools.mark_it_up(text)
+            for chunk_size in (1, 2, 3, 7, 50):
+                self.assertEqual(''.join(self.tools.iter_mark_it_up(io.StringIO(text), chunk_size)), expected)
+
+
+class StripHtmlTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+
+    def test_same_as_07(self):
+        tools_07 = quandy_07.Tools()
+        for text in make_documents(3000) + make_records(1000):
+            self.assertEqual(self.tools.strip_html(text), tools_07.strip_html(text))
+
+    def test_iter_strip_html(self):
+        for text in make_documents(1000):
+            expected = self.tools.strip_html(text)
+            for chunk_size in (1, 2, 3, 5):
+                self.assertEqual(''.join(self.tools.iter_strip_html(io.StringIO(text), chunk_size)), expected)
+
+    def test_max_tag_length(self):
+        # a '<' left open past max_tag_length is given back as text, even if a '>' comes later
+        text = 'a<%s>b' % ('x' * 20)
+        self.assertEqual(''.join(self.tools.iter_strip_html(io.StringIO(text), 5, max_tag_length=100)), 'ab')
+        self.assertEqual(''.join(self.tools.iter_strip_html(io.StringIO(text), 5, max_tag_length=10)), text)
+
+
+class Fix1252CodesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+
+    def test_every_byte(self):
+        for code in range(256):
+            char = chr(code)
+            for text in (char, 'a%sb' % char, '\u2603%s' % char, '%s\u2603' % char):
+                self.assertEqual(self.tools.fix_1252_codes(text), fix_1252_reference(text))
+            for data in (bytes(bytearray([code])), b'a' + bytes(bytearray([code])) + b'b'):
+                self.assertEqual(self.tools.fix_1252_codes(data), fix_1252_reference(data))
+
+    def test_random_text(self):
+        rnd = random.Random(14)
+        chars = [chr(code) for code in range(0x70, 0x100)] + ['\u2603', '\u20ac', '\U0001f600']
+        for n in range(2000):
+            text = ''.join(rnd.choice(chars) for i in range(rnd.randint(0, 40)))
+            self.assertEqual(self.tools.fix_1252_codes(text), fix_1252_reference(text))
+        # long enough to be fixed in pieces
+        text = ''.join(rnd.choice(chars) for i in range(200000))
+        self.assertEqual(self.tools.fix_1252_codes(text), fix_1252_reference(text))
+
+    def test_clean_text_unchanged(self):
+        tools_07 = quandy_07.Tools()
+        for text in ('', 'plain text', '\xe9t\xe9 \u2603'):
+            self.assertIs(self.tools.fix_1252_codes(text), text)
+            self.assertEqual(self.tools.fix_1252_codes(text), tools_07.fix_1252_codes(text))
+        self.assertIs(self.tools.fix_1252_codes(b'plain bytes'), b'plain bytes')
+
+    def test_iter_fix_1252_codes(self):
+        rnd = random.Random(14)
+        data = bytes(bytearray(rnd.randint(0, 255) for i in range(5000)))
+        text = ''.join(rnd.choice(['\x91', '\x85', 'a', '\xe9', '\u2603']) for i in range(5000))
+        for chunk_size in (1, 7, 4096):
+            self.assertEqual(''.join(self.tools.iter_fix_1252_codes(io.BytesIO(data), chunk_size)), fix_1252_reference(data))
+            self.assertEqual(''.join(self.tools.iter_fix_1252_codes(io.StringIO(text), chunk_size)), fix_1252_reference(text))
+
+
+def make_names(count, seed=19):
+    """Names and phrases mixing delimiters, Mc/Mac and characters whose capitalized form isn't their uppercase."""
+    rnd = random.Random(seed)
+    pieces = ['mc', 'mac', 'Mc', 'MAC', 'mcmac', 'donald', 'x', "o'", "'s ", "'S", ' ', '-', '"', "'", '  ',
+              '\xdf', '\ufb01', '\u01c6', '\u0130', 'i', '\u03c3', 'A', 'the', '\t']
+    return [''.join(rnd.choice(pieces) for i in range(rnd.randint(0, 10))) for n in range(count)]
+
+
+class PcaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+        self.tools_07 = quandy_07.Tools()
+
+    def assertSamePcase(self, texts):
+        for names in (False, True):
+            self.assertEqual([self.tools.pcase(text, names) for text in texts],
+                             [self.tools_07.pcase(text, names) for text in texts])
+
+    def test_random_names(self):
+        self.assertSamePcase(make_names(20000))
+
+    def test_code_points(self):
+        # every code point below U+3000 and a sample of the rest, at the start, after each
+        # delimiter and after mc/mac/mcm (the whole range was checked once; it takes minutes)
+        rnd = random.Random(19)
+        codes = list(range(0x3000)) + rnd.sample(range(0x3000, 0x110000), 5000)
+        chars = [chr(code) for code in codes if not 0xd800 <= code < 0xe000]
+        for context in ('%sx', 'a %sx', 'a-%sx', 'a"%sx', "a'%sx", 'mc%sx', 'mac%sx', 'mcm%sx'):
+            self.assertSamePcase([context % char for char in chars])
+
+    def test_capitalize(self):
+        for text in make_names(2000) + ['', '\xdf', '\ufb01x']:
+            self.assertEqual(self.tools.capitalize(text), self.tools_07.capitalize(text))
+
+    def test_pcase_many(self):
+        texts = make_names(2000) * 2
+        cache = quandy.LRUCache(100)
+        for names in (False, True):
+            expected = [self.tools.pcase(text, names) for text in texts]
+            self.assertEqual(self.tools.pcase_many(texts, names), expected)
+            self.assertEqual(self.tools.pcase_many(texts, names, cache), expected)
+
+
+class NameConverterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+        self.tools_07 = quandy_07.Tools()
+        rnd = random.Random(20)
+        pieces = ['first', 'NAME', '_', '__', ' ', '-', 'mc', "'", '&#39;', '"', '.', ',', '!', '?', '(', ')', '%', '[',
+                  '\xdf', '\ufb01', '\u01c6', '\u0130', 'x']
+        self.names = [''.join(rnd.choice(pieces) for i in range(rnd.randint(0, 8))) for n in range(20000)]
+        self.names += [42, 3.5, None, True]
+
+    def assertSameNames(self, names):
+        self.assertEqual([self.tools.friendly_name(name) for name in names],
+                         [self.tools_07.friendly_name(name) for name in names])
+        self.assertEqual([self.tools.unfriendly_name(name) for name in names],
+                         [self.tools_07.unfriendly_name(name) for name in names])
+
+    def test_same_as_07(self):
+        self.assertSameNames(self.names)
+        self.assertSameNames(self.names) # again, from the caches
+
+    def test_code_points(self):
+        rnd = random.Random(20)
+        codes = list(range(0x3000)) + rnd.sample(range(0x3000, 0x110000), 5000)
+        chars = [chr(code) for code in codes if not 0xd800 <= code < 0xe000]
+        for context in ('%sx', 'a_%sx', 'a-%sx'):
+            self.assertSameNames([context % char for char in chars])
+
+    def test_small_cache(self):
+        converter = quandy.NameConverter(maxsize=10)
+        names = self.names[:500] * 2
+        self.assertEqual(converter.friendly_many(names), [self.tools_07.friendly_name(name) for name in names])
+        self.assertEqual(converter.unfriendly_many(names), [self.tools_07.unfriendly_name(name) for name in names])
+
+
+class TokensTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+        self.tools_07 = quandy_07.Tools()
+        rnd = random.Random(21)
+        # the delimiters, plus whitespace that strip() removes but make_list_from_string doesn't split on
+        pieces = ['a', 'bc', '123', '\t', '\n', '\x0b', '\x0c', '\r', ',', ';', ' ', '  ', ',;, ', '\xa0', '\u2003', '\x1c']
+        self.texts = [''.join(rnd.choice(pieces) for i in range(rnd.randint(0, 15))) for n in range(20000)]
+
+    def test_make_list_from_string(self):
+        self.assertEqual([self.tools.make_list_from_string(text) for text in self.texts],
+                         [self.tools_07.make_list_from_string(text) for text in self.texts])
+
+    def test_iter_tokens(self):
+        for text in self.texts[:5000]:
+            expected = self.tools_07.make_list_from_string(text)
+            if expected == ['']:
+                expected = [] # empty input yields nothing
+            self.assertEqual(list(self.tools.iter_tokens(text)), expected)
+            for chunk_size in (1, 2, 3, 50):
+                self.assertEqual(list(self.tools.iter_tokens(io.StringIO(text), chunk_size)), expected)
+        pieces = ['a, b', 'c;', '', ' d', '', ' e\xa0', '', 'f']
+        self.assertEqual(list(self.tools.iter_tokens(pieces)), self.tools_07.make_list_from_string(''.join(pieces)))
+
+
+if __name__ == '__main__':
+    unittest.main()
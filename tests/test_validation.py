@@ -0,0 +1,162 @@
+"""
+Tests for the validators and PasswordHasher, checked against Quandy 0.7 (tests/quandy_07.py) where it had them.
+Run with python -m pytest (or python -m unittest discover tests).
+"""
+
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import quandy
+import quandy_07
+
+
+def make_addresses(count, seed=17):
+    """Strings built from pieces of real and broken addresses, plus random runs of address characters."""
+    rnd = random.Random(seed)
+    pieces = ['bob', 'a.b', 'x+y', "o'neil", '_', '-', '.', '..', '@', '@@', 'example', 'com', '.com', 'co.uk',
+              'EXAMPLE', 'Bob', 'a-', '-a', '9', ' ', '\xe9', '!', '#', '{', '~', '(', ')', ',', 'mail.']
+    chars = "abcXYZ09.-_@+'!#{}~ ()"
+    output = []
+    for n in range(count):
+        if rnd.random() < 0.5:
+            output.append(''.join(rnd.choice(pieces) for i in range(rnd.randint(0, 8))))
+        else:
+            output.append(''.join(rnd.choice(chars) for i in range(rnd.randint(0, 20))))
+    return output
+
+
+class ValidateEmailTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tools = quandy.Tools()
+        self.addresses = make_addresses(20000)
+
+    def test_same_as_07(self):
+        tools_07 = quandy_07.Tools()
+        expected = [tools_07.validate_email(address) for address in self.addresses]
+        self.assertTrue(any(expected) and not all(expected))
+        self.assertEqual([self.tools.validate_email(address) for address in self.addresses], expected)
+        # again, with the domain cache warm
+        self.assertEqual([self.tools.validate_email(address) for address in self.addresses], expected)
+
+    def test_long_string_without_address(self):
+        self.assertFalse(self.tools.validate_email('a' * 5000 + '@'))
+
+    def test_iter_validate_emails(self):
+        lines = ['%s\n' % address for address in self.addresses[:2000]] + ['\n', '   \n']
+        expected = [(number, line.strip(), self.tools.validate_email(line.strip()))
+                    for number, line in enumerate(lines, 1) if line.strip()]
+        self.assertEqual(list(self.tools.iter_validate_emails(lines)), expected)
+        self.assertEqual(list(self.tools.iter_validate_emails(lines, workers=2, batch_size=100)), expected)
+        handle, path = tempfile.mkstemp(suffix='.txt')
+        try:
+            with os.fdopen(handle, 'w') as f:
+                f.writelines(lines)
+            self.assertEqual(list(self.tools.iter_validate_emails(path)), expected)
+        finally:
+            os.remove(path)
+
+
+def make_passwords(count, seed=23):
+    """(username, password1, password2) rows mixing lengths, character groups, usernames and typos."""
+    rnd = random.Random(seed)
+    groups = ['abcxyz', 'ABCXYZ', '0189', '!@# _-\xe9']
+    names = ['bob', 'Alice', 'x', '']
+    output = []
+    for n in range(count):
+        used = rnd.sample(groups, rnd.randint(1, 4))
+        password = ''.join(rnd.choice(rnd.choice(used)) for i in range(rnd.choice([0, 1, 5, 7, 8, 9, 12, 39, 40, 41, 60])))
+        username = rnd.choice(names + [password])
+        if rnd.random() < 0.2:
+            password = rnd.choice(names) + password
+        confirm = password if rnd.random() < 0.9 else password + 'x'
+        output.append((username, password, confirm))
+    return output
+
+
+class PasswordPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = make_passwords(5000)
+
+    def test_validate_password_same_as_07(self):
+        tools, tools_07 = quandy.Tools(), quandy_07.Tools()
+        for strict in (False, True):
+            for minlen, maxlen in ((8, 40), (1, 10), (0, 100), (12, 12)):
+                for row in self.rows:
+                    self.assertEqual(tools.validate_password(*row, strict=strict, minlen=minlen, maxlen=maxlen),
+                                     tools_07.validate_password(*row, strict=strict, minlen=minlen, maxlen=maxlen),
+                                     (row, strict, minlen, maxlen))
+
+    def test_contains_username(self):
+        policy = quandy.PasswordPolicy(username='contains')
+        self.assertEqual(policy.validate('bob', 'myBOBpassword'), 'Password must not contain username')
+        self.assertEqual(policy.validate('bob', 'bob'), 'Password must be at least 8 characters in length')
+        self.assertEqual(policy.validate('bobbybob', 'bobbybob'), 'Password must not be the same as username')
+        self.assertTrue(policy.validate('bob', 'mypassword') is True)
+        self.assertTrue(policy.validate('', 'mypassword') is True)
+        self.assertTrue(quandy.PasswordPolicy(username=None).validate('bobbybob', 'bobbybob') is True)
+        self.assertTrue(quandy.PasswordPolicy().validate('bob', 'myBOBpassword') is True)
+
+    def test_validate_many(self):
+        policy = quandy.PasswordPolicy(min_groups=2)
+        rows = self.rows + [row[:2] for row in self.rows]
+        self.assertEqual(list(policy.validate_many(iter(rows))), [policy.validate(*row) for row in rows])
+        # leaving out the confirmation skips the match check
+        self.assertTrue(policy.validate('bob', 'Password', 'Pasword') is not True)
+        self.assertTrue(list(policy.validate_many([('bob', 'Password')])) == [True])
+
+    def test_bad_rules(self):
+        self.assertRaises(ValueError, quandy.PasswordPolicy, username='starts')
+        self.assertRaises(ValueError, quandy.PasswordPolicy, min_groups=5)
+        self.assertRaises(ValueError, quandy.PasswordPolicy, min_groups=-1)
+        self.assertIn('four of the following', quandy.PasswordPolicy(min_groups=4).validate('bob', 'Password1'))
+
+
+class PasswordHasherTest(unittest.TestCase):
+
+    @unittest.skipUnless(hasattr(hashlib, 'scrypt'), 'needs hashlib.scrypt')
+    def test_scrypt_format(self):
+        hasher = quandy.PasswordHasher('scrypt')
+        encoded = hasher.hash('correct horse')
+        self.assertTrue(encoded.startswith('$scrypt$n=16384,p=1,r=8$'), encoded) # as in the docstring
+        self.assertTrue(hasher.verify('correct horse', encoded))
+        self.assertFalse(hasher.verify('wrong horse', encoded))
+        self.assertFalse(hasher.needs_rehash(encoded))
+        self.assertTrue(quandy.PasswordHasher('scrypt', n=32768).needs_rehash(encoded))
+
+    def test_pbkdf2_format(self):
+        hasher = quandy.PasswordHasher('pbkdf2', iterations=1000)
+        encoded = hasher.hash('correct horse')
+        self.assertTrue(encoded.startswith('$pbkdf2-sha256$i=1000$'), encoded)
+        self.assertTrue(hasher.verify('correct horse', encoded))
+        self.assertTrue(quandy.PasswordHasher('pbkdf2', iterations=2000).needs_rehash(encoded))
+
+    def test_legacy_digest(self):
+        hasher = quandy.PasswordHasher('pbkdf2', iterations=1000)
+        legacy = quandy.Tools().make_hash('correct horse')
+        self.assertTrue(hasher.needs_rehash(legacy))
+        self.assertEqual(hasher.verify_and_update('wrong horse', legacy), (False, None))
+        ok, encoded = hasher.verify_and_update('correct horse', legacy)
+        self.assertTrue(ok)
+        self.assertTrue(hasher.verify('correct horse', encoded))
+
+    def test_bytes_password(self):
+        # bytes are taken as UTF-8 on both the hash() and the make_hash() path
+        hasher = quandy.PasswordHasher('pbkdf2', iterations=1000)
+        password = 'caf\xe9 horse'
+        for encoded in (hasher.hash(password), quandy.Tools().make_hash(password)):
+            self.assertTrue(hasher.verify(password.encode('utf-8'), encoded))
+            self.assertFalse(hasher.verify(password.encode('latin-1'), encoded))
+            self.assertFalse(hasher.verify(b'wrong horse', encoded))
+        self.assertTrue(hasher.verify(password, hasher.hash(password.encode('utf-8'))))
+
+
+if __name__ == '__main__':
+    unittest.main()